@@ -1,17 +1,46 @@
 # app.py
 import streamlit as st
-from src.data_loader import load_data
+from src.app_data import load_catalog, load_data
+from src.data_loader import available_resolutions
+from src.query import get_index
 from src.metrics import display_current_metrics
-from src.correlation_analysis import show_correlation_analysis
-from src.temporal_analysis import show_temporal_analysis
+from src.figure_cache import figure_cache
+from src.profiling import QUERY_PARAM, finish_run, profiled, profiling_requested, show_profile_panel, start_run
 import logging
-from src.geospatial import create_map
-from src.health_risk import show_health_risk_assessment
 
 logging.basicConfig(level=logging.INFO)
 
 # app.py
 
+# Each section imports its module when first shown, so plotly, scipy and
+# folium load only for the sections that need them
+
+def show_temporal_section(df):
+    from src.temporal_analysis import show_temporal_analysis
+    show_temporal_analysis(df)
+
+def show_correlation_section(df):
+    from src.correlation_analysis import show_correlation_analysis
+    st.header("🔄 Pollutant Correlations")
+    show_correlation_analysis(df)
+
+def show_map_section(df):
+    from src.geospatial import show_map
+    st.header("🗺️ Geographic Distribution")
+    show_map(df)
+
+def show_health_section(df):
+    from src.health_risk import show_health_risk_assessment
+    show_health_risk_assessment(df)
+
+# Dashboard sections in display order
+SECTIONS = {
+    "Temporal Analysis": show_temporal_section,
+    "Correlation Analysis": show_correlation_section,
+    "Geographic Visualization": show_map_section,
+    "Health Risk Assessment": show_health_section,
+}
+
 def main():
     st.set_page_config(
         page_title="Enhanced Air Quality Analytics",
@@ -46,27 +75,51 @@ def main():
         </style>
         """, unsafe_allow_html=True)
     
+    # Set AQI_PROFILE=1 or open the app with ?profile=1 to time this rerun
+    profiling = profiling_requested(st.query_params.get(QUERY_PARAM))
+    if profiling:
+        start_run()
+    try:
+        show_dashboard()
+    finally:
+        if profiling:
+            show_profile_panel(finish_run(), figure_cache.stats())
+
+def show_dashboard():
     st.title("🌍 Air Quality Analytics Dashboard")
     
-    # Load data
-    df = load_data()
-    if df is None or df.empty:
-        st.error("Failed to load data. Please check the data source.")
-        return
-        
     # Sidebar filters
     st.sidebar.header("Filters")
     
+    # Hourly station data is offered only when hourly files are present
+    resolutions = available_resolutions() or ['daily']
+    resolution = resolutions[0]
+    if len(resolutions) > 1:
+        resolution = st.sidebar.radio(
+            "Data Resolution",
+            options=resolutions,
+            format_func=str.title,
+            horizontal=True
+        )
+    
+    # Load the city catalog; readings are loaded per selection below
+    with profiled('load_catalog'):
+        catalog = load_catalog(resolution)
+    if catalog is None or catalog.empty:
+        st.error("Failed to load data. Please check the data source.")
+        return
+    
     # City selection
+    city_options = sorted(catalog['City'])
     selected_cities = st.sidebar.multiselect(
         "Select Cities",
-        options=sorted(df['City'].unique()),
-        default=sorted(df['City'].unique())[:3]
+        options=city_options,
+        default=city_options[:3]
     )
     
     # Set min and max dates from data
-    min_date = df['Timestamp'].min().date()
-    max_date = df['Timestamp'].max().date()
+    min_date = catalog['First_Timestamp'].min().date()
+    max_date = catalog['Last_Timestamp'].max().date()
     
     try:
         date_range = st.sidebar.date_input(
@@ -86,12 +139,24 @@ def main():
         start_date, end_date = min_date, max_date
         st.sidebar.warning("Using default date range due to invalid selection")
     
-    # Filter data
-    filtered_df = df[
-        (df['City'].isin(selected_cities)) &
-        (df['Timestamp'].dt.date >= start_date) &
-        (df['Timestamp'].dt.date <= end_date)
-    ]
+    if not selected_cities:
+        st.warning("No data available for the selected filters. Please adjust your selection.")
+        return
+        
+    # Load only the selected cities and dates
+    with profiled('load_data') as record:
+        df = load_data(tuple(selected_cities), start_date, end_date, resolution)
+        if record is not None and df is not None:
+            record['rows_out'] = len(df)
+    if df is None:
+        st.error("Failed to load data. Please check the data source.")
+        return
+    
+    # Tabs slice this through the shared (City, Timestamp) index
+    with profiled('filter', rows_in=len(df)) as record:
+        filtered_df = get_index(df).df
+        if record is not None:
+            record['rows_out'] = len(filtered_df)
     
     if filtered_df.empty:
         st.warning("No data available for the selected filters. Please adjust your selection.")
@@ -100,25 +165,16 @@ def main():
     # Display metrics
     display_current_metrics(filtered_df)
     
-    # Tabs for different analyses
-    tab1, tab2, tab3, tab4 = st.tabs([
-        "Temporal Analysis", 
-        "Correlation Analysis",
-        "Geographic Visualization",
-        "Health Risk Assessment"
-    ])
-    
-    with tab1:
-        show_temporal_analysis(filtered_df)
-        
-    with tab2:
-        st.header("🔄 Pollutant Correlations")
-        show_correlation_analysis(filtered_df)
-    with tab3:
-        st.header("🗺️ Geographic Distribution")
-        create_map(filtered_df)
-    with tab4:
-        show_health_risk_assessment(filtered_df)
+    # Only the chosen section runs on each rerun; its heavy results are
+    # cached per data version, so switching back to a section is quick
+    section = st.radio(
+        "Section",
+        options=list(SECTIONS),
+        horizontal=True,
+        label_visibility="collapsed",
+        key="section"
+    )
+    SECTIONS[section](filtered_df)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,97 @@
+"""Rerun latency of every dashboard section on a large synthetic hourly dataset
+
+Generates CPCB-style hourly station files (unless they already exist),
+then drives the app headlessly with every city selected and times the
+first run and the reruns triggered by each section's main widgets:
+
+    python -m benchmarks.hourly_latency --out /tmp/aqi-hourly --cities 20 --stations 12 --years 5
+"""
+import argparse
+import os
+import time
+from datetime import timedelta
+from pathlib import Path
+from benchmarks.synthetic import generate, write_registry
+
+APP = Path(__file__).resolve().parent.parent / 'app.py'
+
+def timed(label: str, action, results: dict):
+    started = time.perf_counter()
+    app = action()
+    results[label] = time.perf_counter() - started
+    failures = [e.message for e in app.exception] + [e.value for e in app.warning]
+    print(f"{label:>32}: {results[label]:7.2f}s" + (f"  ({failures[0]})" if failures else ""))
+    return app
+
+def widget(widgets, label: str):
+    return next(w for w in widgets if w.label == label)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--out', type=Path, required=True, help="directory holding the synthetic data folder")
+    parser.add_argument('--cities', type=int, default=20)
+    parser.add_argument('--stations', type=int, default=12, help="stations per city")
+    parser.add_argument('--years', type=float, default=5)
+    parser.add_argument('--target', type=float, default=2.0, help="rerun latency target in seconds")
+    args = parser.parse_args()
+
+    if not (args.out / 'data' / 'hourly').exists():
+        started = time.perf_counter()
+        rows = generate(args.out, args.cities, args.stations, args.years, 'h')
+        print(f"Generated {rows:,} rows in {time.perf_counter() - started:.1f}s")
+    elif not (args.out / 'data' / 'stations.csv').exists():
+        write_registry(args.out, args.cities, args.stations)
+    # The loader reads data/ relative to the working directory
+    os.chdir(args.out)
+
+    from streamlit.testing.v1 import AppTest
+    app = AppTest.from_file(str(APP), default_timeout=3600)
+    results = {}
+
+    timed('first run (ingest)', app.run, results)
+    # The resolution switch only appears when daily files exist as well
+    if any(radio.label == "Data Resolution" for radio in app.sidebar.radio):
+        widget(app.sidebar.radio, "Data Resolution").set_value('hourly')
+        timed('switch to hourly (ingest)', app.run, results)
+    cities = widget(app.sidebar.multiselect, "Select Cities")
+    cities.set_value(cities.options)
+    timed('load all cities (build)', app.run, results)
+    timed('unchanged rerun', app.run, results)
+
+    periods = widget(app.radio, "Select Time Period")
+    for period in periods.options:
+        periods.set_value(period)
+        timed(f'temporal: {period}', app.run, results)
+    # A section's first visit builds its cached results, like the initial load
+    app.radio(key='section').set_value('Correlation Analysis')
+    timed('open correlation (build)', app.run, results)
+    city = widget(app.selectbox, "Select City")
+    for option in city.options[:2]:
+        city.set_value(option)
+        timed(f'correlation: {option}', app.run, results)
+    pollutant = widget(app.selectbox, "Select X-axis pollutant")
+    pollutant.set_value('NO2')
+    timed('correlation: x = NO2', app.run, results)
+    app.radio(key='section').set_value('Geographic Visualization')
+    timed('open geographic (build)', app.run, results)
+    # Each day's surface is interpolated on its first visit, then cached
+    for step in range(1, 3):
+        day = widget(app.slider, "Day")
+        day.set_value(day.value - timedelta(days=1))
+        timed(f'map: day -{step}', app.run, results)
+    widget(app.selectbox, "Measure").set_value('AQI')
+    timed('map: AQI surface', app.run, results)
+    app.radio(key='section').set_value('Health Risk Assessment')
+    timed('open health (build)', app.run, results)
+    for section in ('Temporal Analysis', 'Correlation Analysis'):
+        app.radio(key='section').set_value(section)
+        timed(f'back to {section.split()[0].lower()}', app.run, results)
+
+    reruns = {label: seconds for label, seconds in results.items()
+              if not label.endswith(('(ingest)', '(build)'))}
+    slowest = max(reruns, key=reruns.get)
+    verdict = 'within' if reruns[slowest] <= args.target else 'OVER'
+    print(f"Slowest rerun: {slowest} at {reruns[slowest]:.2f}s, {verdict} the {args.target:.1f}s target")
+
+if __name__ == "__main__":
+    main()
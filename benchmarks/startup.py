@@ -0,0 +1,100 @@
+"""Import time of the dashboard at startup and of each section it loads later
+
+Imports app in a fresh interpreter with -X importtime, then each section
+module in turn, and reports what every stage costs and its slowest
+modules. Exits non-zero when importing app exceeds the budget or pulls in
+a dependency that only a section should load:
+
+    python -m benchmarks.startup --budget 1.5 --json startup.json
+"""
+import argparse
+import json
+import re
+import subprocess
+import sys
+from pathlib import Path
+from typing import Dict, List
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# Imported by the app at startup, then by each section on first render
+STAGES = ['app', 'src.temporal_analysis', 'src.correlation_analysis', 'src.geospatial', 'src.health_risk']
+
+# Heavy dependencies that must not load before their section renders;
+# plotly.graph_objects is left out as streamlit itself imports it
+DEFERRED = ['scipy', 'folium', 'streamlit_folium', 'plotly.express']
+
+LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \| (\s*)(\S+)")
+
+def import_times() -> Dict[str, List[dict]]:
+    """Modules first imported by each stage, in a fresh interpreter
+
+    Every entry has the module name, its nesting depth and its self and
+    cumulative import times in seconds.
+    """
+    code = "; ".join(f"import {module}" for module in STAGES)
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', code],
+                            cwd=ROOT, capture_output=True, text=True)
+    if result.returncode:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+
+    stages: Dict[str, List[dict]] = {}
+    pending: List[dict] = []
+    # Lines come children first; a depth 0 line closes one top-level import
+    for match in map(LINE.match, result.stderr.splitlines()):
+        if not match:
+            continue
+        self_us, cumulative_us, indent, module = match.groups()
+        pending.append({'module': module, 'depth': len(indent) // 2,
+                        'self': int(self_us) / 1e6, 'cumulative': int(cumulative_us) / 1e6})
+        if not indent:
+            stages[module] = pending
+            pending = []
+    return {stage: stages.get(stage, []) for stage in STAGES}
+
+def summarize(stages: Dict[str, List[dict]], top: int) -> Dict[str, dict]:
+    summary = {}
+    for stage, modules in stages.items():
+        names = {m['module'] for m in modules}
+        summary[stage] = {
+            'seconds': modules[-1]['cumulative'] if modules else 0.0,
+            'modules': len(modules),
+            'deferred_loaded': [name for name in DEFERRED if name in names],
+            'slowest': sorted(({'module': m['module'], 'self': m['self']} for m in modules),
+                              key=lambda m: m['self'], reverse=True)[:top],
+        }
+    return summary
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--budget', type=float, default=1.5, help="seconds allowed for importing app")
+    parser.add_argument('--repeat', type=int, default=3, help="runs to take the fastest of")
+    parser.add_argument('--top', type=int, default=8, help="slowest modules listed per stage")
+    parser.add_argument('--json', type=Path, help="write the summary to this file")
+    args = parser.parse_args()
+
+    # The first run also pays for cold disk caches
+    runs = [summarize(import_times(), args.top) for _ in range(args.repeat)]
+    summary = min(runs, key=lambda run: run['app']['seconds'])
+
+    for stage, result in summary.items():
+        print(f"{stage:>26}: {result['seconds']:6.3f}s over {result['modules']:4d} new modules")
+        for module in result['slowest']:
+            print(f"{'':>30}{module['self']:6.3f}s  {module['module']}")
+
+    failures = []
+    if summary['app']['seconds'] > args.budget:
+        failures.append(f"importing app took {summary['app']['seconds']:.2f}s, over the {args.budget:.2f}s budget")
+    if summary['app']['deferred_loaded']:
+        failures.append(f"app imports {', '.join(summary['app']['deferred_loaded'])} at startup")
+
+    if args.json:
+        args.json.write_text(json.dumps({'budget': args.budget, 'failures': failures, 'stages': summary}, indent=2))
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    if failures:
+        sys.exit(1)
+    print(f"Startup within the {args.budget:.2f}s budget")
+
+if __name__ == "__main__":
+    main()
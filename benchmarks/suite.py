@@ -0,0 +1,207 @@
+"""Timings of the data pipeline and every figure builder on synthetic data
+
+Generates a dataset of the chosen scale (unless the output directory
+already holds one), then times loading, AQI computation, the app's
+filtering step, temporal feature extraction and each chart builder.
+Every step is timed cold, with nothing cached for its data, and warm,
+with only its figure rebuilt. Results go to JSON for comparing commits:
+
+    python -m benchmarks.suite --scale small --out /tmp/aqi-small
+    python -m benchmarks.suite --scale small --out /tmp/aqi-small --compare /tmp/aqi-small/results/small-abc1234.json
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+import numpy as np
+import pandas as pd
+from benchmarks.synthetic import SCALES, Scale, generate, write_registry
+
+ROOT = Path(__file__).resolve().parent.parent
+
+def git_commit() -> str:
+    """Short hash of the checked out commit, marked when the tree has changes"""
+    def git(*args) -> str:
+        return subprocess.run(['git', *args], cwd=ROOT, capture_output=True, text=True).stdout.strip()
+    commit = git('rev-parse', '--short', 'HEAD') or 'unknown'
+    return commit + ('-dirty' if git('status', '--porcelain', '--untracked-files=no') else '')
+
+def prepare_data(out: Path, scale: Scale, nan_fraction: float) -> int:
+    """Generate the dataset once per output directory, returning its row count"""
+    manifest = out / 'dataset.json'
+    wanted = {**scale._asdict(), 'nan_fraction': nan_fraction}
+    if manifest.exists():
+        existing = json.loads(manifest.read_text())
+        if {key: existing.get(key) for key in wanted} != wanted:
+            raise SystemExit(f"{out} holds a different dataset ({existing}); choose another --out")
+        if not (out / 'data' / 'stations.csv').exists():
+            write_registry(out, scale.cities, scale.stations)
+        return existing['rows']
+
+    started = time.perf_counter()
+    rows = generate(out, scale.cities, scale.stations, scale.years, scale.freq, nan_fraction)
+    print(f"Generated {rows:,} rows in {time.perf_counter() - started:.1f}s")
+    manifest.write_text(json.dumps({**wanted, 'rows': rows}))
+    return rows
+
+def fresh_version(df: pd.DataFrame, *parts) -> pd.DataFrame:
+    """The same rows under a new data version, so no cached result applies"""
+    from src.utils import data_version, derive_version
+    copy = df.copy(deep=False)
+    copy.attrs['data_version'] = derive_version(data_version(df), 'benchmark', *parts)
+    return copy
+
+def timed(func: Callable, *args) -> float:
+    started = time.perf_counter()
+    func(*args)
+    return time.perf_counter() - started
+
+def loading_steps(cities: tuple, resolution: str, repeat: int) -> Dict[str, dict]:
+    """Time ingesting the source files, building the series stores and loading"""
+    from src.data_loader import CACHE_DIR, read_catalog, read_data
+    from src.timeseries_store import rebuild_all
+
+    results = {}
+    # CACHE_DIR is relative to the generated dataset, so this only drops its caches
+    shutil.rmtree(CACHE_DIR, ignore_errors=True)
+    results['read_data (ingest)'] = {'cold': timed(read_data, cities, None, None, resolution)}
+    results['timeseries stores'] = {'cold': timed(rebuild_all)}
+    results['read_catalog'] = {'cold': min(timed(read_catalog, resolution) for _ in range(repeat))}
+    results['read_data'] = {'cold': min(timed(read_data, cities, None, None, resolution) for _ in range(repeat))}
+    return results
+
+def pipeline_steps(df: pd.DataFrame) -> Dict[str, Callable[[pd.DataFrame], object]]:
+    """Every timed step after loading, each taking the loaded frame"""
+    from src.aqi import calculate_aqi
+    from src.correlation_analysis import create_correlation_heatmap, create_relationship_scatter
+    from src.data_processor import process_temporal_data
+    from src.geospatial import create_map, station_geojson
+    from src.spatial import idw_surface
+    from src.stations import registry_version
+    from src.health_risk import create_gauge_chart, create_historical_trend
+    from src.moments import get_regressions
+    from src.query import get_index
+    from src.temporal_analysis import (create_daily_trend, create_hourly_pattern, create_monthly_trend,
+                                       create_yearly_trend, prepare_temporal_features)
+    from src.visualizations import create_temporal_plots
+
+    index = get_index(df)
+    city = index.cities[0]
+    _, last = index.date_bounds()
+    quarter = (last - pd.Timedelta(days=90)).date(), last.date()
+    pollutants = ['PM2.5', 'PM10', 'NO2', 'SO2', 'CO']
+
+    def scatter(d: pd.DataFrame):
+        regressions = get_regressions(d)
+        fit = regressions[(regressions['City'] == 'All Cities') & (regressions['X'] == 'PM2.5')
+                          & (regressions['Y'] == 'PM10')].iloc[0]
+        return create_relationship_scatter(d, 'PM2.5', 'PM10', "PM2.5 vs PM10", True,
+                                           (fit['slope'], fit['intercept']))
+
+    return {
+        'calculate_aqi': calculate_aqi,
+        'filter (app)': lambda d: get_index(d).df,
+        'filter (city, 90 days)': lambda d: get_index(d).query([city], *quarter),
+        'prepare_temporal_features': prepare_temporal_features,
+        'create_daily_trend': create_daily_trend,
+        'create_daily_trend (90 days)': lambda d: create_daily_trend(d, *quarter),
+        'create_hourly_pattern': create_hourly_pattern,
+        'create_monthly_trend': create_monthly_trend,
+        'create_yearly_trend': create_yearly_trend,
+        'create_correlation_heatmap': lambda d: create_correlation_heatmap(d, pollutants),
+        'create_relationship_scatter': scatter,
+        'create_gauge_chart': lambda d: create_gauge_chart(float(np.nanmean(d['AQI'].to_numpy()))),
+        'create_historical_trend': lambda d: create_historical_trend(d, city),
+        'create_temporal_plots': lambda d: create_temporal_plots(process_temporal_data(d)),
+        # Rendering is what st_folium does with the map on every rerun
+        'station map (layer + render)': lambda d: create_map(station_geojson(d, registry_version())).get_root().render(),
+        'idw_surface (PM2.5, last day)': lambda d: idw_surface(d, last.date(), 'PM2.5'),
+    }
+
+def run_suite(scale: Scale, out: Path, repeat: int, only: Optional[List[str]]) -> Dict[str, dict]:
+    from src.data_loader import city_sources, read_data
+    from src.figure_cache import figure_cache
+
+    resolution = 'hourly' if scale.freq == 'h' else 'daily'
+    cities = tuple(city_sources(resolution))
+    results = loading_steps(cities, resolution, repeat)
+    for step, timing in results.items():
+        print(f"{step:>32}: {timing['cold']:8.3f}s")
+
+    df = read_data(cities, None, None, resolution)
+    for step, func in pipeline_steps(df).items():
+        if only and step not in only:
+            continue
+        cold, warm = [], []
+        try:
+            for run in range(repeat):
+                data = fresh_version(df, step, run)
+                figure_cache.clear()
+                cold.append(timed(func, data))
+                # Shared results stay cached; only the figure is rebuilt
+                figure_cache.clear()
+                warm.append(timed(func, data))
+        except Exception as e:
+            results[step] = {'error': f"{type(e).__name__}: {e}"}
+            print(f"{step:>32}: failed, {results[step]['error']}")
+            continue
+        results[step] = {'cold': min(cold), 'warm': min(warm)}
+        print(f"{step:>32}: {min(cold):8.3f}s cold {min(warm):8.3f}s warm")
+    return results
+
+def compare(results: Dict[str, dict], baseline_path: Path):
+    """Print each step's time against a previous run"""
+    baseline = json.loads(baseline_path.read_text())
+    print(f"\nAgainst {baseline['commit']} ({baseline_path.name}):")
+    for step, timing in results.items():
+        before = baseline['results'].get(step, {})
+        for kind in ('cold', 'warm'):
+            if kind in timing and kind in before and before[kind] > 0:
+                print(f"{step:>32} {kind}: {before[kind]:8.3f}s -> {timing[kind]:8.3f}s "
+                      f"({timing[kind] / before[kind]:5.2f}x)")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--out', type=Path, required=True, help="directory for the dataset and results")
+    parser.add_argument('--scale', choices=SCALES, default='small')
+    parser.add_argument('--nan-fraction', type=float, default=0.05)
+    parser.add_argument('--repeat', type=int, default=3, help="runs per step, keeping the fastest")
+    parser.add_argument('--only', nargs='+', help="time only these steps after loading")
+    parser.add_argument('--json', type=Path, help="results file; defaults to <out>/results/<scale>-<commit>.json")
+    parser.add_argument('--compare', type=Path, help="previous results file to compare against")
+    args = parser.parse_args()
+
+    out = args.out.resolve()
+    out.mkdir(parents=True, exist_ok=True)
+    scale = SCALES[args.scale]
+    rows = prepare_data(out, scale, args.nan_fraction)
+    # The loader reads data/ relative to the working directory
+    os.chdir(out)
+
+    commit = git_commit()
+    results = run_suite(scale, out, args.repeat, args.only)
+    report = {
+        'commit': commit,
+        'recorded': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'numpy': np.__version__,
+        'scale': {'name': args.scale, **scale._asdict(), 'nan_fraction': args.nan_fraction, 'rows': rows},
+        'repeat': args.repeat,
+        'results': results,
+    }
+    path = args.json or out / 'results' / f"{args.scale}-{commit}.json"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(report, indent=2))
+    print(f"Results written to {path}")
+    if args.compare:
+        compare(results, args.compare)
+
+if __name__ == "__main__":
+    main()
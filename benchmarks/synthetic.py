@@ -0,0 +1,189 @@
+"""Synthetic station data for benchmarking
+
+Writes one file per city in the layout the loader reads, each holding
+every station of the city in time order: CPCB-style hourly exports under
+data/hourly, or daily city files under data, optionally with the
+all-cities combined file as well. Readings go missing the way station data
+does: whole stations drop out for days, single sensors for hours, and some
+stations never had some sensors at all. A station registry with
+coordinates is written to data/stations.csv.
+
+    python -m benchmarks.synthetic --cities 20 --stations 12 --years 5 --out /tmp/aqi
+    python -m benchmarks.synthetic --scale large --out /tmp/aqi
+"""
+import argparse
+import numpy as np
+import pandas as pd
+from pathlib import Path
+from pandas.tseries.frequencies import to_offset
+from contextlib import ExitStack
+from typing import Dict, List, NamedTuple, Optional, TextIO
+
+# Typical level of each pollutant relative to PM2.5
+POLLUTANT_SCALE = {
+    'PM2.5 (ug/m3)': 1.0,
+    'PM10 (ug/m3)': 1.9,
+    'NO2 (ug/m3)': 0.45,
+    'NH3 (ug/m3)': 0.3,
+    'SO2 (ug/m3)': 0.15,
+    'CO (mg/m3)': 0.012,
+    'Ozone (ug/m3)': 0.35,
+}
+# Daily city files use the bare pollutant names
+DAILY_COLUMNS = {column: column.split(' (')[0].replace('Ozone', 'O3') for column in POLLUTANT_SCALE}
+
+class Scale(NamedTuple):
+    cities: int
+    stations: int
+    years: float
+    freq: str
+
+# Named dataset sizes, from the shipped data's size up to national station scale
+SCALES: Dict[str, Scale] = {
+    'small': Scale(10, 1, 5, 'D'),
+    'medium': Scale(20, 12, 5, 'D'),
+    'large': Scale(100, 10, 10, 'D'),
+    'hourly': Scale(20, 12, 5, 'h'),
+    'xlarge': Scale(100, 10, 10, 'h'),
+}
+
+# Share of the missing readings due to whole-station outages; the rest are
+# single sensors dropping out
+OUTAGE_SHARE = 0.4
+OUTAGE_DAYS = 2.0
+SENSOR_GAP_HOURS = 6.0
+# Chance that a station has no sensor at all for a pollutant other than PM2.5
+MISSING_SENSOR_CHANCE = 0.1
+
+# Cities are placed inside India's bounding box, stations around their city
+LATITUDE_RANGE = (8.0, 32.0)
+LONGITUDE_RANGE = (69.0, 92.0)
+STATION_SPREAD_DEGREES = 0.15
+
+def city_names(count: int) -> List[str]:
+    return [f"City {i:03d}" for i in range(count)]
+
+def gap_mask(length: int, fraction: float, mean_run: float, rng: np.random.Generator) -> np.ndarray:
+    """Mark about fraction of length positions as missing, in runs of mean_run on average"""
+    mean_run = max(mean_run, 1.0)
+    runs = rng.poisson(fraction * length / mean_run)
+    starts = rng.integers(0, length, runs)
+    ends = np.minimum(starts + rng.geometric(1 / mean_run, runs), length)
+    depth = np.zeros(length + 1, dtype=np.int32)
+    np.add.at(depth, starts, 1)
+    np.add.at(depth, ends, -1)
+    return np.cumsum(depth[:-1]) > 0
+
+def station_frame(timestamps: pd.DatetimeIndex, station: str, level: float, steps_per_day: int,
+                  nan_fraction: float, rng: np.random.Generator) -> pd.DataFrame:
+    """Readings of one station with seasonal and diurnal cycles and gaps"""
+    hours = timestamps.hour.to_numpy()
+    day_of_year = timestamps.dayofyear.to_numpy()
+    # Winter smog and morning/evening traffic peaks
+    seasonal = 1 + 0.6 * np.cos(2 * np.pi * (day_of_year - 15) / 365.25)
+    diurnal = 1 + 0.25 * np.cos(2 * np.pi * (hours - 8) / 24) + 0.2 * np.cos(2 * np.pi * (hours - 20) / 12)
+    base = level * seasonal * diurnal
+
+    outage = gap_mask(len(timestamps), nan_fraction * OUTAGE_SHARE, OUTAGE_DAYS * steps_per_day, rng)
+    frame = pd.DataFrame({'Station': station}, index=range(len(timestamps)))
+    for column, scale in POLLUTANT_SCALE.items():
+        values = base * scale * rng.lognormal(0, 0.35, len(timestamps))
+        if column != 'PM2.5 (ug/m3)' and rng.random() < MISSING_SENSOR_CHANCE:
+            values[:] = np.nan
+        else:
+            sensor = gap_mask(len(timestamps), nan_fraction * (1 - OUTAGE_SHARE),
+                              SENSOR_GAP_HOURS * steps_per_day / 24, rng)
+            values[outage | sensor] = np.nan
+        frame[column] = values.round(2)
+    return frame
+
+def write_city(path: Path, city: str, stations: int, start: str, days: int, freq: str,
+               nan_fraction: float, seed: int, combined: Optional[TextIO] = None) -> int:
+    """Write one city's file, interleaving its stations reading by reading"""
+    rng = np.random.default_rng(seed)
+    step = to_offset(freq)
+    steps_per_day = 24 if freq == 'h' else 1
+    timestamps = pd.date_range(start, periods=days * steps_per_day, freq=step)
+    level = rng.uniform(30, 150)
+    frames = [
+        station_frame(timestamps, station_name(city, station), level * rng.uniform(0.7, 1.3),
+                      steps_per_day, nan_fraction, rng)
+        for station in range(stations)
+    ]
+    df = pd.concat(frames, keys=range(stations), names=['station', 'position']).swaplevel().sort_index(kind='stable')
+    positions = df.index.get_level_values('position')
+    if freq == 'h':
+        df.insert(0, 'From Date', timestamps.strftime('%d-%m-%Y %H:%M')[positions])
+        df.insert(1, 'To Date', (timestamps + step).strftime('%d-%m-%Y %H:%M')[positions])
+    else:
+        df = df.rename(columns={'Station': 'Location', **DAILY_COLUMNS})
+        df.insert(0, 'Timestamp', timestamps.strftime('%d-%m-%Y')[positions])
+    df.to_csv(path, index=False, lineterminator='\n')
+    if combined is not None and freq != 'h':
+        # The all-cities file repeats the rows with the city after the date
+        df.insert(1, 'City', city)
+        df.to_csv(combined, index=False, header=combined.tell() == 0, lineterminator='\n')
+    return len(df)
+
+def station_name(city: str, station: int) -> str:
+    return f"{city} - Station {station + 1}"
+
+def write_registry(out: Path, cities: int, stations: int, seed: int = 0) -> Path:
+    """Write the coordinates of every station to out/data/stations.csv"""
+    rng = np.random.default_rng(seed)
+    names = city_names(cities)
+    centres = np.column_stack([rng.uniform(*LATITUDE_RANGE, cities), rng.uniform(*LONGITUDE_RANGE, cities)])
+    offsets = rng.normal(0, STATION_SPREAD_DEGREES, (cities, stations, 2))
+    coordinates = (centres[:, None, :] + offsets).reshape(-1, 2)
+    registry = pd.DataFrame({
+        'Location': [station_name(city, station) for city in names for station in range(stations)],
+        'City': np.repeat(names, stations),
+        'Latitude': coordinates[:, 0].round(5),
+        'Longitude': coordinates[:, 1].round(5),
+    })
+    path = out / 'data' / 'stations.csv'
+    path.parent.mkdir(parents=True, exist_ok=True)
+    registry.to_csv(path, index=False, lineterminator='\n')
+    return path
+
+def generate(out: Path, cities: int = 10, stations: int = 1, years: float = 5, freq: str = 'h',
+             nan_fraction: float = 0.05, start: str = '2020-01-01', seed: int = 0,
+             combined: bool = False) -> int:
+    """Write a synthetic dataset under out/data, returning the number of rows
+
+    freq is 'h' for hourly station files or 'D' for daily city files; with
+    combined, daily rows are also written to the all-cities combined file.
+    """
+    directory, suffix = (out / 'data' / 'hourly', '_hourly.csv') if freq == 'h' else (out / 'data', '_combined.csv')
+    directory.mkdir(parents=True, exist_ok=True)
+    days = int(years * 365.25)
+    rows = 0
+    with ExitStack() as stack:
+        all_cities = None
+        if combined and freq != 'h':
+            all_cities = stack.enter_context(open(out / 'data' / 'all_cities_aqi_combined.csv', 'w', newline=''))
+        for i, city in enumerate(city_names(cities)):
+            path = directory / f"{city.lower().replace(' ', '_')}{suffix}"
+            rows += write_city(path, city, stations, start, days, freq, nan_fraction, seed + i, all_cities)
+    write_registry(out, cities, stations, seed)
+    return rows
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--out', type=Path, required=True, help="directory to create the data folder in")
+    parser.add_argument('--scale', choices=SCALES, help="named size; overrides the size options below")
+    parser.add_argument('--cities', type=int, default=10)
+    parser.add_argument('--stations', type=int, default=1, help="stations per city")
+    parser.add_argument('--years', type=float, default=5)
+    parser.add_argument('--daily', action='store_true', help="write daily city files instead of hourly ones")
+    parser.add_argument('--combined', action='store_true', help="also write the all-cities combined daily file")
+    parser.add_argument('--nan-fraction', type=float, default=0.05)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    scale = SCALES[args.scale] if args.scale else Scale(args.cities, args.stations, args.years, 'D' if args.daily else 'h')
+    rows = generate(args.out, scale.cities, scale.stations, scale.years, scale.freq, args.nan_fraction,
+                    seed=args.seed, combined=args.combined)
+    print(f"Wrote {rows:,} {'hourly' if scale.freq == 'h' else 'daily'} rows under {args.out / 'data'}")
+
+if __name__ == "__main__":
+    main()
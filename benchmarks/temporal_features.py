@@ -0,0 +1,68 @@
+"""Allocations per rerun of the temporal feature extraction
+
+Compares the per-chart frame copies the temporal tab used to make with the
+calendar codes shared per data version. Run from the repository root:
+
+    python -m benchmarks.temporal_features --repeat 10
+"""
+import argparse
+import time
+import tracemalloc
+import pandas as pd
+from typing import Callable, Dict
+from src.data_loader import read_data
+from src.features import FEATURES, get_calendar
+from src.utils import derive_version
+
+def legacy_features(df: pd.DataFrame) -> pd.DataFrame:
+    """Feature extraction as the temporal tab did it once per chart"""
+    df = df.copy()
+    df['Date'] = pd.to_datetime(df['Timestamp']).dt.date
+    df['Day'] = pd.to_datetime(df['Timestamp']).dt.day_name()
+    df['Month'] = pd.to_datetime(df['Timestamp']).dt.month
+    df['Year'] = pd.to_datetime(df['Timestamp']).dt.year
+    return df
+
+def legacy_rerun(df: pd.DataFrame):
+    # The tab prepared the frame once itself and once more inside the chart
+    for _ in range(2):
+        legacy_features(df)
+
+def calendar_rerun(df: pd.DataFrame):
+    get_calendar(df).columns(FEATURES)
+
+def measure(rerun: Callable[[pd.DataFrame], None], df: pd.DataFrame, reruns: int) -> Dict[str, float]:
+    """Peak traced allocation and wall time of the first and later reruns"""
+    results = {}
+    for run in range(reruns):
+        tracemalloc.start()
+        started = time.perf_counter()
+        rerun(df)
+        elapsed = time.perf_counter() - started
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        label = 'first' if run == 0 else 'rerun'
+        results[f'{label}_peak_mb'] = max(results.get(f'{label}_peak_mb', 0), peak / 1024 ** 2)
+        results[f'{label}_seconds'] = max(results.get(f'{label}_seconds', 0), elapsed)
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=1, help="tile the loaded data this many times")
+    parser.add_argument('--reruns', type=int, default=5, help="simulated reruns per strategy")
+    args = parser.parse_args()
+
+    df = read_data()
+    if args.repeat > 1:
+        version = df.attrs['data_version']
+        df = pd.concat([df] * args.repeat, ignore_index=True)
+        df.attrs['data_version'] = derive_version(version, 'repeat', args.repeat)
+    print(f"{len(df):,} rows, {args.reruns} reruns")
+
+    for name, rerun in [('legacy copies', legacy_rerun), ('calendar codes', calendar_rerun)]:
+        stats = measure(rerun, df, args.reruns)
+        print(f"{name:>15}: first {stats['first_peak_mb']:8.1f} MB {stats['first_seconds']:6.3f}s | "
+              f"rerun {stats['rerun_peak_mb']:8.1f} MB {stats['rerun_seconds']:6.3f}s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,461 @@
+"""Dashboard analytics as plain data: frozen dataclasses and DataFrames,
+and the plotly figures shared by the app and the reports
+
+Nothing here imports Streamlit, so batch jobs and worker processes get
+the same results as the app, cached per data version in the same way.
+"""
+import calendar
+import numpy as np
+import pandas as pd
+import plotly.express as px
+import plotly.graph_objects as go
+from dataclasses import dataclass
+from typing import List, Optional, Sequence, Tuple
+from src.aqi import AQI_CATEGORIES, AQI_COLORS, AQI_HEALTH_IMPACTS, SUB_INDEX_EDGES
+from src.downsample import MAX_POINTS, downsample_series, envelope
+from src.figure_cache import cached_figure
+from src.moments import ALL_CITIES, get_moments, get_regressions
+from src.profiling import instrumented
+from src.query import get_index
+from src.rolling import city_grid, rolling_window
+from src.rollup import DateLike, get_cube
+from src.snapshot import get_snapshot
+from src.utils import cached_by_version
+
+# Upper AQI bound, label, colour and advice of each health risk band: the
+# NAQI categories of src.aqi, with the top band left open
+RISK_BANDS = list(zip([*SUB_INDEX_EDGES[1:-1], np.inf], AQI_CATEGORIES, AQI_COLORS, AQI_HEALTH_IMPACTS))
+# Lower and upper AQI, colour and name of each NAQI band
+AQI_BANDS = list(zip(SUB_INDEX_EDGES[:-1], SUB_INDEX_EDGES[1:], AQI_COLORS, AQI_CATEGORIES))
+
+# Cities above the lower edge of this band are flagged as high risk
+ALERT_CATEGORY = "Poor"
+ALERT_AQI = float(SUB_INDEX_EDGES[AQI_CATEGORIES.index(ALERT_CATEGORY)])
+
+HEALTH_CONDITIONS = ["None", "Asthma", "Heart Disease", "Lung Disease", "Elderly", "Children", "Pregnant"]
+
+CONDITION_ADVICE = {
+    "Asthma": ["Keep rescue inhaler readily available", "Monitor breathing patterns closely"],
+    "Heart Disease": ["Limit outdoor activities", "Stay in air-conditioned environments"],
+    "Lung Disease": ["Limit outdoor activities", "Stay in air-conditioned environments"],
+    "Elderly": ["Avoid prolonged outdoor exposure", "Wear appropriate masks when outside"],
+    "Children": ["Avoid prolonged outdoor exposure", "Wear appropriate masks when outside"],
+    "Pregnant": ["Avoid prolonged outdoor exposure", "Wear appropriate masks when outside"],
+}
+
+@dataclass(frozen=True)
+class RiskLevel:
+    category: str
+    color: str
+    advice: str
+
+NO_READING = RiskLevel("No reading", "#808080", "No AQI reading is available.")
+
+@dataclass(frozen=True)
+class CityStatus:
+    """Latest reading of one city, or of one of its stations, with its risk level"""
+    city: str
+    timestamp: pd.Timestamp
+    aqi: float
+    risk: RiskLevel
+    station: Optional[str] = None
+
+    @property
+    def alert(self) -> bool:
+        return self.aqi > ALERT_AQI
+
+@dataclass(frozen=True)
+class CurrentStatus:
+    """Latest reading of every city, by name and from worst to best AQI"""
+    cities: Tuple[CityStatus, ...]
+    ranking: Tuple[CityStatus, ...]
+    worst: Optional[CityStatus]
+    best: Optional[CityStatus]
+    average_aqi: float
+
+    @property
+    def alerts(self) -> Tuple[CityStatus, ...]:
+        return tuple(status for status in self.cities if status.alert)
+
+@dataclass(frozen=True)
+class AQISummary:
+    average: float
+    maximum: float
+    minimum: float
+
+@dataclass(frozen=True)
+class Regression:
+    """Least-squares fit of y on x over the rows where both are present"""
+    city: str
+    x: str
+    y: str
+    n: int
+    slope: float
+    intercept: float
+    r: float
+    r_squared: float
+    p_value: float
+
+    @property
+    def strength(self) -> str:
+        if abs(self.r) > 0.7:
+            return "strong"
+        if abs(self.r) > 0.3:
+            return "moderate"
+        return "weak"
+
+def risk_level(aqi: float) -> RiskLevel:
+    """Health risk band of an AQI value, or NO_READING for NaN"""
+    for upper, category, color, advice in RISK_BANDS:
+        if aqi <= upper:
+            return RiskLevel(category, color, advice)
+    # NaN compares false against every bound
+    return NO_READING
+
+def condition_advice(conditions: Sequence[str]) -> List[str]:
+    """Advice for the given health conditions, in order and without repeats"""
+    advice = []
+    for condition in conditions:
+        for line in CONDITION_ADVICE.get(condition, []):
+            if line not in advice:
+                advice.append(line)
+    return advice
+
+def _status(row: pd.Series, by: str = 'City') -> CityStatus:
+    aqi = float(row['AQI'])
+    station = str(row['Location']) if by == 'Location' else None
+    return CityStatus(str(row['City']), row['Timestamp'], aqi, risk_level(aqi), station)
+
+def current_status(df: pd.DataFrame) -> CurrentStatus:
+    """Latest reading and risk level of every city in the frame
+
+    Built from the snapshot shared by every view of the same data version.
+    """
+    snapshot = get_snapshot(df)
+    worst, best = snapshot.worst, snapshot.best
+    return CurrentStatus(
+        cities=tuple(_status(row) for _, row in snapshot.frame.iterrows()),
+        ranking=tuple(_status(row) for _, row in snapshot.ranking.iterrows()),
+        worst=_status(worst) if worst is not None else None,
+        best=_status(best) if best is not None else None,
+        average_aqi=float(snapshot.frame['AQI'].mean()) if len(snapshot) else float('nan'),
+    )
+
+def station_status(df: pd.DataFrame) -> Tuple[CityStatus, ...]:
+    """Latest reading and risk level of every station, ordered by station name"""
+    if 'Location' not in df.columns:
+        return ()
+    snapshot = get_snapshot(df, by='Location')
+    return tuple(_status(row, 'Location') for _, row in snapshot.frame.iterrows())
+
+def aqi_summary(df: pd.DataFrame) -> AQISummary:
+    """Average, maximum and minimum AQI over the rows of a frame"""
+    aqi = df['AQI']
+    return AQISummary(float(aqi.mean()), float(aqi.max()), float(aqi.min()))
+
+@cached_by_version(maxsize=32)
+def temporal_aggregate(df: pd.DataFrame, by: str, measure: str = 'AQI', start_date: Optional[DateLike] = None,
+                       end_date: Optional[DateLike] = None) -> pd.DataFrame:
+    """Count, mean, std, min and max of a measure per City and one calendar key
+
+    by is 'hour', 'weekday', 'month', 'season' or 'year'; hours roll up
+    from rows and cover the whole loaded range only. Each key is merged
+    once per data version, measure and date range.
+    """
+    return get_cube(df).aggregate(by, measure, start_date=start_date, end_date=end_date)
+
+def available_years(df: pd.DataFrame) -> List[int]:
+    """Years with at least one reading"""
+    return sorted(int(year) for year in get_cube(df).aggregate('year')['Year'].unique())
+
+def available_months(df: pd.DataFrame, year: int) -> List[int]:
+    """Months of a year with at least one reading"""
+    months = get_cube(df).aggregate('month', start_date=f"{year}-01-01", end_date=f"{year}-12-31")
+    return sorted(int(month) for month in months['Month'].unique())
+
+def has_hourly_readings(df: pd.DataFrame) -> bool:
+    """Whether readings fall at more than one hour of the day"""
+    return get_cube(df).rollups['hour']['Hour'].nunique() > 1
+
+def correlation_matrix(df: pd.DataFrame, pollutants: Sequence[str], cities: Optional[Sequence[str]] = None,
+                       start_date: Optional[DateLike] = None, end_date: Optional[DateLike] = None) -> pd.DataFrame:
+    """Pairwise-complete Pearson correlation of the pollutants, like DataFrame.corr()"""
+    return get_moments(df).correlation(pollutants, cities, start_date, end_date)
+
+def regressions(df: pd.DataFrame) -> pd.DataFrame:
+    """Fit of every ordered pollutant pair per city, with ALL_CITIES rows pooling every city"""
+    return get_regressions(df)
+
+def regression(df: pd.DataFrame, x: str, y: str, city: str = ALL_CITIES) -> Optional[Regression]:
+    """Fit of y on x for one city or ALL_CITIES, if more than two rows have both"""
+    table = get_regressions(df)
+    fit = table[(table['City'] == city) & (table['X'] == x) & (table['Y'] == y)]
+    if fit.empty or fit['n'].iloc[0] <= 2:
+        return None
+    row = fit.iloc[0]
+    return Regression(
+        city=city, x=x, y=y, n=int(row['n']),
+        **{field: float(row[field]) for field in ('slope', 'intercept', 'r', 'r_squared', 'p_value')}
+    )
+
+def strongest_relationships(df: pd.DataFrame, city: str = ALL_CITIES) -> pd.DataFrame:
+    """One fit per unordered pollutant pair of a city, strongest first
+
+    Both directions of a pair share r and R², so only X before Y in the
+    pollutant order is kept.
+    """
+    table = get_regressions(df)
+    order = {pollutant: i for i, pollutant in enumerate(get_moments(df).measures)}
+    table = table[
+        (table['City'] == city) &
+        (table['X'].map(order) < table['Y'].map(order)) &
+        (table['n'] > 2)
+    ]
+    return table.sort_values('r_squared', ascending=False).drop(columns='City').reset_index(drop=True)
+
+def city_names(df: pd.DataFrame) -> List[str]:
+    """Cities in the frame, in (City, Timestamp) order"""
+    return get_index(df).cities
+
+# Figures
+
+@instrumented()
+@cached_figure('gauge')
+def create_gauge_chart(aqi_value: float) -> go.Figure:
+    """Create a gauge chart for AQI visualization"""
+    risk = risk_level(aqi_value)
+    
+    fig = go.Figure(go.Indicator(
+        mode="gauge+number",
+        value=aqi_value,
+        domain={'x': [0, 1], 'y': [0, 1]},
+        gauge={
+            'axis': {'range': [0, SUB_INDEX_EDGES[-1]]},
+            'bar': {'color': risk.color},
+            'steps': [{'range': [low, high], 'color': color} for low, high, color, _ in AQI_BANDS],
+            'threshold': {
+                'line': {'color': "red", 'width': 4},
+                'thickness': 0.75,
+                'value': aqi_value
+            }
+        },
+        title={'text': f"Current AQI Level: {risk.category}"}
+    ))
+    
+    return fig
+
+@instrumented()
+@cached_figure('historical_trend')
+def create_historical_trend(df: pd.DataFrame, city: str, max_points: int = MAX_POINTS) -> go.Figure:
+    """Create an enhanced AQI trend visualization with adaptive moving averages
+
+    Long ranges are downsampled to at most max_points per trace: the
+    daily range band keeps its extremes through a min/max envelope and
+    the moving average keeps each bucket's lowest and highest point.
+    Narrower date ranges are shown at full resolution.
+    """
+    # Data preparation: daily range and mean from the time-series store
+    first_timestamp, last_timestamp = get_index(df).date_bounds([city])
+    
+    # Calculate date range span
+    date_span = (last_timestamp - first_timestamp).days
+    
+    daily_data = pd.DataFrame({
+        'AQI_min': city_grid(df, 'AQI_min', (city,))[city],
+        'AQI_max': city_grid(df, 'AQI_max', (city,))[city],
+        'AQI_mean': city_grid(df, 'AQI', (city,))[city]
+    }).reset_index()
+    
+    # Adaptive SMA calculation based on date range
+    if date_span >= 365:
+        ma_window = 30
+        ma_label = '30-day Moving Average'
+    else:
+        ma_window = 7
+        ma_label = '7-day Moving Average'
+    
+    daily_data['AQI_MA'] = rolling_window(daily_data['AQI_mean'].to_numpy(), ma_window, statistics=('mean',))['mean']
+    
+    daily_data = daily_data.set_index('Timestamp')
+    band_min, band_max = envelope(daily_data['AQI_min'], daily_data['AQI_max'], max_points)
+    moving_average = downsample_series(daily_data['AQI_MA'], max_points)
+    
+    fig = go.Figure()
+    
+    # Add AQI category zones
+    for start, end, color, name in AQI_BANDS:
+        fig.add_hrect(
+            y0=start, y1=end,
+            fillcolor=color,
+            opacity=0.2,
+            line=dict(width=0),
+            name=name,
+            showlegend=True
+        )
+    
+    # Add daily range area
+    fig.add_trace(go.Scatter(
+        x=band_max.index,
+        y=band_max,
+        mode='lines',
+        line=dict(width=0),
+        showlegend=False,
+        hoverinfo='skip'
+    ))
+    
+    fig.add_trace(go.Scatter(
+        x=band_min.index,
+        y=band_min,
+        mode='lines',
+        fill='tonexty',
+        fillcolor='rgba(0, 255, 255, 0.1)',
+        line=dict(width=0),
+        name='Daily Range',
+        hovertemplate="<b>Date</b>: %{x|%Y-%m-%d}<br>" +
+                     "<b>Range</b>: %{y:.0f} - %{text:.0f}<br>" +
+                     "<extra></extra>",
+        text=band_max
+    ))
+    
+    # Add moving average
+    fig.add_trace(go.Scatter(
+        x=moving_average.index,
+        y=moving_average,
+        mode='lines',
+        name=ma_label,
+        line=dict(color='#ff47ff', width=2.5),
+        hovertemplate=f"<b>Date</b>: %{{x|%Y-%m-%d}}<br>" +
+                     f"<b>{ma_label}</b>: %{{y:.0f}}<br>" +
+                     "<extra></extra>"
+    ))
+    
+    # Layout updates
+        # Layout updates
+    fig.update_layout(
+        template='plotly_dark',
+        plot_bgcolor='rgba(25,25,25,1)',
+        paper_bgcolor='rgba(25,25,25,1)',
+        title=dict(
+            text=f"AQI Trend Analysis - {city}",
+            font=dict(size=20, color='#ffffff'),
+            x=0.5,
+            y=0.95
+        ),
+        xaxis=dict(
+            title="Date",
+            title_font=dict(size=14, color='#ffffff'),
+            tickfont=dict(size=12, color='#ffffff'),
+            gridcolor='rgba(255,255,255,0.1)',
+            showgrid=True,
+            rangeslider=dict(visible=True),
+            rangeselector=dict(
+                buttons=list([
+                    dict(count=7, label="1W", step="day", stepmode="backward"),
+                    dict(count=1, label="1M", step="month", stepmode="backward"),
+                    dict(count=3, label="3M", step="month", stepmode="backward"),
+                    dict(count=6, label="6M", step="month", stepmode="backward"),
+                    dict(count=1, label="1Y", step="year", stepmode="backward"),
+                    dict(step="all", label="All")
+                ]),
+                bgcolor='rgba(55,55,55,0.9)',
+                font=dict(color='#ffffff'),
+                activecolor='#00ffff',
+                y=1.1
+            )
+        ),
+        yaxis=dict(
+            title="Air Quality Index (AQI)",
+            title_font=dict(size=14, color='#ffffff'),
+            tickfont=dict(size=12, color='#ffffff'),
+            gridcolor='rgba(255,255,255,0.1)',
+            showgrid=True,
+            range=[0, max(SUB_INDEX_EDGES[-1], daily_data['AQI_max'].max() * 1.1)]
+        ),
+        hovermode='x unified',
+        showlegend=True,
+        legend=dict(
+            yanchor="top",
+            y=0.99,
+            xanchor="left",
+            x=0.01,
+            bgcolor='rgba(0,0,0,0.8)',
+            font=dict(color='#ffffff'),
+            bordercolor='rgba(255,255,255,0.2)',
+            borderwidth=1
+        ),
+        margin=dict(l=60, r=30, t=80, b=60)  # Reduced bottom margin since we removed explanation
+    )
+    
+    return fig
+
+@instrumented()
+@cached_figure('monthly_trend')
+def create_monthly_trend(df: pd.DataFrame, start_date: Optional[DateLike] = None,
+                         end_date: Optional[DateLike] = None) -> Optional[go.Figure]:
+    """Create monthly AQI trend visualization from the rollup cube"""
+    if df.empty or 'AQI' not in df.columns:
+        return None
+        
+    monthly_data = temporal_aggregate(df, 'month', 'AQI', start_date, end_date)
+    if monthly_data.empty:
+        return None
+    monthly_data = monthly_data.rename(columns={'mean': 'AQI'})
+    
+    # Convert month numbers to names for better readability
+    monthly_data['Month_Name'] = monthly_data['Month'].apply(lambda x: calendar.month_name[x])
+    
+    fig = px.line(
+        monthly_data,
+        x='Month',
+        y='AQI',
+        color='City',
+        title='Monthly AQI Trends',
+        labels={'Month': 'Month', 'AQI': 'Average AQI'}
+    )
+    
+    fig.update_layout(
+        xaxis=dict(
+            tickmode='array',
+            ticktext=monthly_data['Month_Name'].unique(),
+            tickvals=monthly_data['Month'].unique(),
+            title='Month'
+        ),
+        hovermode='x unified'
+    )
+    return fig
+
+@instrumented()
+@cached_figure('correlation_heatmap')
+def create_correlation_heatmap(df: pd.DataFrame, pollutants: list,
+                               cities: Optional[Sequence[str]] = None) -> go.Figure:
+    """Create an enhanced correlation heatmap with annotations
+
+    The matrix is assembled from per (City, day) co-moments, so its cost
+    follows the number of days selected rather than the number of rows,
+    and narrowing it to some cities reuses the moments of the whole frame.
+    """
+    corr_df = correlation_matrix(df, pollutants, cities)
+    
+    # Create heatmap with annotations
+    fig = go.Figure(data=go.Heatmap(
+        z=corr_df,
+        x=pollutants,
+        y=pollutants,
+        colorscale='RdBu',
+        zmin=-1,
+        zmax=1,
+        text=np.round(corr_df, 2),
+        texttemplate='%{text}',
+        textfont={"size": 12},
+        showscale=True
+    ))
+    
+    fig.update_layout(
+        title="Correlation Matrix of Air Pollutants",
+        title_x=0.5,
+        width=600,
+        height=500,
+        xaxis_title="Pollutants",
+        yaxis_title="Pollutants"
+    )
+    return fig
@@ -0,0 +1,35 @@
+import logging
+import pandas as pd
+import streamlit as st
+from datetime import date
+from typing import Optional, Sequence
+from src.data_loader import read_catalog, read_data
+
+logger = logging.getLogger(__name__)
+
+@st.cache_data(ttl=3600)
+def load_catalog(resolution: str = 'daily') -> Optional[pd.DataFrame]:
+    """List available cities with their first and last reading"""
+    try:
+        return read_catalog(resolution)
+
+    except Exception as e:
+        logger.error(f"Catalog loading error: {str(e)}")
+        st.error(f"Error loading data catalog: {str(e)}")
+        return None
+
+@st.cache_resource(ttl=3600, max_entries=4)
+def load_data(cities: Optional[Sequence[str]] = None, start_date: Optional[date] = None,
+              end_date: Optional[date] = None, resolution: str = 'daily') -> Optional[pd.DataFrame]:
+    """Load preprocessed data for the selected cities and inclusive date range
+
+    The frame is shared across reruns and sessions rather than copied per
+    rerun, so callers must not modify it in place.
+    """
+    try:
+        return read_data(cities, start_date, end_date, resolution)
+
+    except Exception as e:
+        logger.error(f"Data loading error: {str(e)}")
+        st.error(f"Error loading data: {str(e)}")
+        return None
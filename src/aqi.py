@@ -0,0 +1,97 @@
+import numpy as np
+import pandas as pd
+from typing import Dict, List, Optional
+
+# Indian National AQI (CPCB) breakpoints: concentration edges per pollutant
+# mapped onto the shared sub-index edges below. The open-ended top band is
+# closed one band-width above its lower edge, as in CPCB's reference sheet.
+SUB_INDEX_EDGES = np.array([0, 50, 100, 200, 300, 400, 500], dtype=float)
+
+BREAKPOINTS: Dict[str, np.ndarray] = {
+    'PM2.5': np.array([0, 30, 60, 90, 120, 250, 380], dtype=float),
+    'PM10': np.array([0, 50, 100, 250, 350, 430, 510], dtype=float),
+    'NO2': np.array([0, 40, 80, 180, 280, 400, 520], dtype=float),
+    'SO2': np.array([0, 40, 80, 380, 800, 1600, 2400], dtype=float),
+    'CO': np.array([0, 1, 2, 10, 17, 34, 51], dtype=float),
+    'O3': np.array([0, 50, 100, 168, 208, 748, 1288], dtype=float),
+    'NH3': np.array([0, 200, 400, 800, 1200, 1800, 2400], dtype=float),
+}
+
+AQI_CATEGORIES = ['Good', 'Satisfactory', 'Moderate', 'Poor', 'Very Poor', 'Severe']
+# CPCB colour and likely health impact of each category, in the same order
+AQI_COLORS = ['#00b050', '#92d050', '#ffff00', '#ff9900', '#ff0000', '#c00000']
+AQI_HEALTH_IMPACTS = [
+    "Minimal impact.",
+    "Minor breathing discomfort to sensitive people.",
+    "Breathing discomfort to people with lung disease such as asthma, and discomfort to people with heart disease, children and older adults.",
+    "Breathing discomfort to most people on prolonged exposure.",
+    "Respiratory illness on prolonged exposure.",
+    "Affects healthy people and seriously impacts those with existing diseases.",
+]
+
+# Each band is a straight line, so interpolation reduces to one
+# slope/intercept lookup per value
+_BAND_SLOPES = {
+    p: np.diff(SUB_INDEX_EDGES) / np.diff(edges) for p, edges in BREAKPOINTS.items()
+}
+_BAND_INTERCEPTS = {
+    p: SUB_INDEX_EDGES[:-1] - _BAND_SLOPES[p] * edges[:-1] for p, edges in BREAKPOINTS.items()
+}
+
+def sub_index(values: np.ndarray, pollutant: str, out: Optional[np.ndarray] = None) -> np.ndarray:
+    """Interpolate the sub-index of one pollutant; NaN concentrations stay NaN"""
+    values = np.asarray(values, dtype=float)
+
+    # Band i covers (edges[i], edges[i+1]]; NaN sorts past the last band and
+    # stays NaN through the arithmetic below
+    band = np.searchsorted(BREAKPOINTS[pollutant][1:-1], values, side='left')
+    out = np.multiply(_BAND_SLOPES[pollutant][band], values, out=out)
+    out += _BAND_INTERCEPTS[pollutant][band]
+    return np.clip(out, 0, SUB_INDEX_EDGES[-1], out=out)
+
+def calculate_sub_indices(df: pd.DataFrame, pollutants: Optional[List[str]] = None) -> pd.DataFrame:
+    """Calculate sub-indices for every available pollutant column"""
+    if pollutants is None:
+        pollutants = [p for p in BREAKPOINTS if p in df.columns]
+
+    return pd.DataFrame(
+        {p: sub_index(df[p].to_numpy(dtype=float, na_value=np.nan), p) for p in pollutants},
+        index=df.index
+    )
+
+def calculate_aqi(df: pd.DataFrame, pollutants: Optional[List[str]] = None) -> pd.DataFrame:
+    """Calculate the overall AQI and dominant pollutant for each row
+
+    The AQI is the maximum sub-index across pollutants with a reading.
+    Rows without any reading get a NaN AQI and no dominant pollutant.
+    """
+    if pollutants is None:
+        pollutants = [p for p in BREAKPOINTS if p in df.columns]
+
+    # Sub-indices are never negative, so -1 marks "no reading yet"
+    aqi = np.full(len(df), -1.0)
+    codes = np.full(len(df), -1, dtype=np.int8)
+    sub = np.empty(len(df))
+    higher = np.empty(len(df), dtype=bool)
+
+    # Running maximum keeps a single scratch buffer instead of a rows x pollutants matrix
+    for code, pollutant in enumerate(pollutants):
+        sub_index(df[pollutant].to_numpy(dtype=float, na_value=np.nan), pollutant, out=sub)
+        np.greater(sub, aqi, out=higher)  # NaN compares False
+        np.copyto(aqi, sub, where=higher)
+        np.copyto(codes, code, where=higher)
+
+    aqi[codes < 0] = np.nan
+    return pd.DataFrame({
+        'AQI': aqi,
+        'Dominant_Pollutant': pd.Categorical.from_codes(codes, categories=pollutants)
+    }, index=df.index)
+
+def categorize_aqi(aqi: pd.Series) -> pd.Series:
+    """Map AQI values onto the NAQI health categories"""
+    return pd.cut(
+        aqi,
+        bins=SUB_INDEX_EDGES,
+        labels=AQI_CATEGORIES,
+        include_lowest=True
+    )
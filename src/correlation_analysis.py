@@ -3,52 +3,98 @@ import plotly.graph_objects as go
 import streamlit as st
 import pandas as pd
 import numpy as np
-from scipy import stats
+from typing import Optional, Tuple
+from src.analytics import city_names, create_correlation_heatmap, regression, strongest_relationships
+from src.figure_cache import cached_figure
+from src.moments import ALL_CITIES
+from src.profiling import instrumented
+from src.query import get_index
 
-def create_correlation_heatmap(df: pd.DataFrame, pollutants: list) -> go.Figure:
-    """Create an enhanced correlation heatmap with annotations"""
-    corr_df = df[pollutants].corr()
-    
-    # Create heatmap with annotations
-    fig = go.Figure(data=go.Heatmap(
-        z=corr_df,
-        x=pollutants,
-        y=pollutants,
-        colorscale='RdBu',
-        zmin=-1,
-        zmax=1,
-        text=np.round(corr_df, 2),
-        texttemplate='%{text}',
-        textfont={"size": 12},
-        showscale=True
-    ))
-    
-    fig.update_layout(
-        title="Correlation Matrix of Air Pollutants",
-        title_x=0.5,
-        width=600,
-        height=500,
-        xaxis_title="Pollutants",
-        yaxis_title="Pollutants"
-    )
-    return fig
+# Above this many points markers are drawn with WebGL instead of SVG
+WEBGL_POINTS = 5000
 
-def calculate_regression_stats(x: pd.Series, y: pd.Series) -> dict:
-    """Calculate regression statistics"""
-    mask = ~(np.isnan(x) | np.isnan(y))
-    if mask.sum() < 2:
-        return None
-        
-    slope, intercept, r_value, p_value, std_err = stats.linregress(x[mask], y[mask])
-    r_squared = r_value ** 2
-    
-    return {
-        'slope': slope,
-        'intercept': intercept,
-        'r_squared': r_squared,
-        'p_value': p_value
-    }
+# Above this many points the scatter is replaced by a binned density map
+DENSITY_POINTS = 100000
+DENSITY_BINS = 150
+
+# Share of points trimmed from each end of both axes of the density map
+DENSITY_TAIL = 0.001
+
+
+def density_grid(x: np.ndarray, y: np.ndarray, bins: int = DENSITY_BINS) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Bin centres along x and y and the point count of every (y, x) bin
+
+    Rows missing either value are skipped, and the axes span all but the
+    DENSITY_TAIL extremes so a few outliers do not squeeze the map.
+    """
+    present = ~(np.isnan(x) | np.isnan(y))
+    x, y = x[present], y[present]
+    if not len(x):
+        return np.array([]), np.array([]), np.zeros((0, 0))
+    x_low, x_high = np.quantile(x, [DENSITY_TAIL, 1 - DENSITY_TAIL])
+    y_low, y_high = np.quantile(y, [DENSITY_TAIL, 1 - DENSITY_TAIL])
+    x_high, y_high = max(x_high, x_low + 1e-9), max(y_high, y_low + 1e-9)
+    # Bin by arithmetic and one bincount, far cheaper than histogram2d's searches
+    inside = (x >= x_low) & (x <= x_high) & (y >= y_low) & (y <= y_high)
+    x, y = x[inside], y[inside]
+    # The upper edges are closed, as in histogram2d
+    column = np.minimum((x - x_low) * (bins / (x_high - x_low)), bins - 1).astype(np.int64)
+    row = np.minimum((y - y_low) * (bins / (y_high - y_low)), bins - 1).astype(np.int64)
+    counts = np.bincount(row * bins + column, minlength=bins * bins).reshape(bins, bins)
+    x_edges, y_edges = np.linspace(x_low, x_high, bins + 1), np.linspace(y_low, y_high, bins + 1)
+    return (x_edges[:-1] + x_edges[1:]) / 2, (y_edges[:-1] + y_edges[1:]) / 2, counts
+
+@instrumented()
+@cached_figure('relationship_scatter')
+def create_relationship_scatter(df: pd.DataFrame, x_pollutant: str, y_pollutant: str,
+                                title: str, by_city: bool, fit: Optional[Tuple[float, float]] = None) -> go.Figure:
+    """Create a pollutant scatter plot, coloured by city, with an optional fitted line
+
+    fit is the (slope, intercept) of an already computed regression.
+    Markers switch to WebGL past WEBGL_POINTS, and past DENSITY_POINTS
+    the points are binned into a density map of all cities together.
+    """
+    x = df[x_pollutant].to_numpy(dtype='float64')
+    y = df[y_pollutant].to_numpy(dtype='float64')
+    if len(df) > DENSITY_POINTS:
+        x_centres, y_centres, counts = density_grid(x, y)
+        with np.errstate(divide='ignore'):
+            shade = np.where(counts > 0, np.log10(counts), np.nan)
+        fig = go.Figure(go.Heatmap(
+            x=x_centres,
+            y=y_centres,
+            z=shade,
+            customdata=counts,
+            colorscale='Viridis',
+            colorbar=dict(title='Readings', tickprefix='10^'),
+            hovertemplate=f"{x_pollutant}: %{{x:.1f}}<br>{y_pollutant}: %{{y:.1f}}<br>Readings: %{{customdata:,.0f}}<extra></extra>"
+        ))
+        fig.update_layout(title=title, xaxis_title=x_pollutant, yaxis_title=y_pollutant)
+        x_range = np.array([x_centres[0], x_centres[-1]]) if len(x_centres) else np.array([np.nan, np.nan])
+    else:
+        fig = px.scatter(
+            df,
+            x=x_pollutant,
+            y=y_pollutant,
+            color='City' if by_city else None,
+            title=title,
+            opacity=0.6,
+            render_mode='webgl' if len(df) > WEBGL_POINTS else 'svg'
+        )
+        present = x[~np.isnan(x)]
+        x_range = np.array([present.min(), present.max()]) if len(present) else np.array([np.nan, np.nan])
+    if fit is not None and np.isfinite(x_range).all():
+        slope, intercept = fit
+        fig.add_trace(go.Scatter(
+            x=x_range,
+            y=slope * x_range + intercept,
+            mode='lines',
+            name='OLS trend (all cities)' if by_city else 'OLS trend',
+            line=dict(width=2)
+        ))
+    return fig
 
+@instrumented('section')
 def show_correlation_analysis(df: pd.DataFrame):
     """Display enhanced correlation analysis between pollutants"""
     st.write("### 📊 Air Pollutant Correlation Analysis")
@@ -77,7 +123,7 @@ def show_correlation_analysis(df: pd.DataFrame):
         """)
     
     # Create tabs for different analyses
-    tab1, tab2 = st.tabs(["Correlation Matrix", "Detailed Analysis"])
+    tab1, tab2, tab3 = st.tabs(["Correlation Matrix", "Detailed Analysis", "Strongest Relationships"])
     
     with tab1:
         st.write("#### Correlation Matrix Heatmap")
@@ -105,57 +151,79 @@ def show_correlation_analysis(df: pd.DataFrame):
         with col3:
             selected_city = st.selectbox(
                 "Select City",
-                options=['All Cities'] + sorted(df['City'].unique().tolist())
+                options=[ALL_CITIES] + sorted(city_names(df))
             )
         
         # Filter data based on selection
-        plot_df = df.copy()
-        if selected_city != 'All Cities':
-            plot_df = plot_df[plot_df['City'] == selected_city]
+        plot_df = df
+        if selected_city != ALL_CITIES:
+            plot_df = get_index(df).query([selected_city])
+        
+        # Every pair and city is fitted at once; picking a pair is a lookup
+        fit = regression(df, x_pollutant, y_pollutant, selected_city)
         
         # Create scatter plot with trend line
-        scatter_fig = px.scatter(
+        scatter_fig = create_relationship_scatter(
             plot_df,
-            x=x_pollutant,
-            y=y_pollutant,
-            color='City' if selected_city == 'All Cities' else None,
-            title=f"Relationship between {pollutants[x_pollutant]} and {pollutants[y_pollutant]}",
-            opacity=0.6,
-            trendline="ols" if selected_city != 'All Cities' else None
+            x_pollutant,
+            y_pollutant,
+            f"Relationship between {pollutants[x_pollutant]} and {pollutants[y_pollutant]}",
+            selected_city == ALL_CITIES,
+            (fit.slope, fit.intercept) if fit else None
         )
         
-        # Calculate statistics
-        stats = calculate_regression_stats(plot_df[x_pollutant], plot_df[y_pollutant])
-        
         # Display plot and statistics
         st.plotly_chart(scatter_fig, use_container_width=True)
+        if len(plot_df) > DENSITY_POINTS:
+            st.caption(f"{len(plot_df):,} readings are binned into a density map; shading is on a log scale.")
         
-        if stats:
+        if fit:
             col1, col2 = st.columns(2)
             with col1:
                 st.metric(
                     "R² (Strength of Relationship)",
-                    f"{stats['r_squared']:.3f}"
+                    f"{fit.r_squared:.3f}"
                 )
             with col2:
-                correlation = plot_df[[x_pollutant, y_pollutant]].corr().iloc[0,1]
                 st.metric(
                     "Correlation Coefficient",
-                    f"{correlation:.3f}"
+                    f"{fit.r:.3f}"
                 )
             
             # Add interpretation
             st.write("#### 📝 Interpretation")
-            if abs(correlation) > 0.7:
-                strength = "strong"
-            elif abs(correlation) > 0.3:
-                strength = "moderate"
-            else:
-                strength = "weak"
-                
             st.write(f"""
-            - There is a {strength} {'positive' if correlation > 0 else 'negative'} relationship between 
+            - There is a {fit.strength} {'positive' if fit.r > 0 else 'negative'} relationship between 
               {pollutants[x_pollutant]} and {pollutants[y_pollutant]}.
-            - R² value of {stats['r_squared']:.3f} indicates that {(stats['r_squared']*100):.1f}% of the variation
+            - R² value of {fit.r_squared:.3f} indicates that {(fit.r_squared*100):.1f}% of the variation
               in {pollutants[y_pollutant]} can be explained by {pollutants[x_pollutant]}.
             """)
+    
+    with tab3:
+        st.write("#### Strongest Pollutant Relationships")
+        
+        table_city = st.selectbox(
+            "Show relationships for",
+            options=[ALL_CITIES] + sorted(city_names(df)),
+            key="relationship_city"
+        )
+        
+        # One row per unordered pair: both directions share r and R²
+        table = strongest_relationships(df, table_city)
+        
+        st.dataframe(
+            table,
+            hide_index=True,
+            use_container_width=True,
+            column_config={
+                'X': 'Pollutant X',
+                'Y': 'Pollutant Y',
+                'n': st.column_config.NumberColumn('Readings', format="%d"),
+                'slope': st.column_config.NumberColumn('Slope (Y per X)', format="%.3f"),
+                'intercept': st.column_config.NumberColumn('Intercept', format="%.2f"),
+                'r': st.column_config.NumberColumn('Correlation', format="%.3f"),
+                'r_squared': st.column_config.NumberColumn('R²', format="%.3f"),
+                'p_value': st.column_config.NumberColumn('p-value', format="%.2e"),
+            }
+        )
+        st.caption("Click a column header to sort. Slope and intercept fit Y on X by least squares.")
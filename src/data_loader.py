@@ -1,78 +1,510 @@
-# src/data_loader.py
 import pandas as pd
-import streamlit as st
 import logging
-from typing import Optional
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import date
+import hashlib
+import io
+import json
 import os
+import shutil
+import threading
+import time
 from pathlib import Path
+from pandas.api.types import union_categoricals
+from src.aqi import AQI_CATEGORIES, calculate_aqi, categorize_aqi
+from src.snapshot import fold_appended
+
+try:
+    import fcntl
+except ImportError:  # Windows: caches are only locked within the process
+    fcntl = None
 
 logger = logging.getLogger(__name__)
 
+DATA_DIR = Path('data')
+CACHE_DIR = DATA_DIR / '.cache'
+CITY_FILE_SUFFIX = '_combined.csv'
+COMBINED_FILE = 'all_cities_aqi_combined.csv'
+
+# Hourly station files, one per city, kept apart from the daily city files
+HOURLY_DIR = DATA_DIR / 'hourly'
+HOURLY_FILE_SUFFIX = '_hourly.csv'
+RESOLUTIONS = ['daily', 'hourly']
+
+# Column headers of CPCB station exports, mapped to the names used here
+COLUMN_ALIASES = {
+    'From Date': 'Timestamp',
+    'Station': 'Location',
+    'PM2.5 (ug/m3)': 'PM2.5',
+    'PM10 (ug/m3)': 'PM10',
+    'NO2 (ug/m3)': 'NO2',
+    'NH3 (ug/m3)': 'NH3',
+    'SO2 (ug/m3)': 'SO2',
+    'CO (mg/m3)': 'CO',
+    'Ozone (ug/m3)': 'O3',
+}
+# Redundant for fixed-length intervals, and costly to keep as strings
+DROPPED_COLUMNS = ['To Date']
+
+# Bump whenever the preprocessing below changes so stale caches are rebuilt
+PIPELINE_VERSION = 5
+
+# Small row groups let date predicates skip whole blocks of a city's history
+ROW_GROUP_SIZE = 4096
+MAX_READ_WORKERS = 8
+
+# Source files are parsed in blocks of about this many bytes, one cache part each
+CHUNK_BYTES = 32 * 1024 ** 2
+
+# Appends land as extra parquet parts, compacted once there are this many
+MAX_CACHE_PARTS = 32
+
+_CACHE_LOCKS: Dict[str, threading.Lock] = {}
+
+POLLUTANTS = ['PM2.5', 'PM10', 'NO2', 'NH3', 'SO2', 'CO', 'O3']
+DAY_NAMES = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+
+# Compact in-memory schema for the loaded frame; pollutants not listed here keep their dtype
+SCHEMA = {
+    'City': 'category',
+    'Location': 'category',
+    **{pollutant: 'float32' for pollutant in POLLUTANTS},
+    'AQI': 'float32',
+    'Dominant_Pollutant': 'category',
+    'Risk_Category': pd.CategoricalDtype(AQI_CATEGORIES, ordered=True),
+    'Day': pd.CategoricalDtype(DAY_NAMES, ordered=True),
+    'Month': 'int8',
+    'Year': 'int16',
+}
+
 class DataValidationError(Exception):
     pass
 
-def calculate_aqi(pm25: float) -> float:
-    """Calculate AQI from PM2.5 values using EPA standards"""
-    aqi_breakpoints = [
-        (0, 12.0, 0, 50),
-        (12.1, 35.4, 51, 100),
-        (35.5, 55.4, 101, 150),
-        (55.5, 150.4, 151, 200),
-        (150.5, 250.4, 201, 300),
-        (250.5, 500.4, 301, 500)
-    ]
-    
-    for low_pm25, high_pm25, low_aqi, high_aqi in aqi_breakpoints:
-        if low_pm25 <= pm25 <= high_pm25:
-            return ((high_aqi - low_aqi) / (high_pm25 - low_pm25) * (pm25 - low_pm25) + low_aqi)
-    return 500
-
-@st.cache_data(ttl=3600)
-def load_data() -> Optional[pd.DataFrame]:
-    """Load and preprocess data with enhanced validation"""
+def source_fingerprint(paths: Iterable[Path]) -> str:
+    """Fingerprint source files by name, size and modification time"""
+    digest = hashlib.sha1(f"pipeline:{PIPELINE_VERSION}".encode())
+    for path in sorted(paths):
+        stat = path.stat()
+        digest.update(f"{path.name}:{stat.st_size}:{stat.st_mtime_ns}".encode())
+    return digest.hexdigest()[:16]
+
+def city_sources(resolution: str = 'daily') -> Dict[str, Path]:
+    """Map each city name to its per-city CSV file at the given resolution"""
+    if resolution not in RESOLUTIONS:
+        raise DataValidationError(f"Unknown resolution: {resolution}")
+    directory, suffix = (DATA_DIR, CITY_FILE_SUFFIX) if resolution == 'daily' else (HOURLY_DIR, HOURLY_FILE_SUFFIX)
+    return {
+        path.name[:-len(suffix)].replace('_', ' ').title(): path
+        for path in sorted(directory.glob(f"*{suffix}"))
+        if path.name != COMBINED_FILE
+    }
+
+def available_resolutions() -> List[str]:
+    """Resolutions that have at least one city file"""
+    return [resolution for resolution in RESOLUTIONS if city_sources(resolution)]
+
+def _parse_rows(data: bytes, city: str, name: str, columns: Optional[List[str]] = None) -> pd.DataFrame:
+    """Parse CSV rows and derive AQI, risk and calendar columns
+
+    Without columns the data must start with the header line; with columns
+    it is a headerless chunk such as the appended tail of a file.
+    """
+    # Modified read_csv with explicit date parsing
+    df = pd.read_csv(
+        io.BytesIO(data),
+        header=None if columns else 'infer',
+        names=columns,
+        usecols=lambda column: column not in DROPPED_COLUMNS
+    ).rename(columns=COLUMN_ALIASES)
+    if 'Timestamp' in df.columns:
+        # Dates are in dd-mm-yyyy format, with an hour for hourly files
+        df['Timestamp'] = pd.to_datetime(df['Timestamp'], dayfirst=True)
+    if 'City' not in df.columns:
+        df.insert(1, 'City', city)
+
+    required_columns = ['PM2.5', 'PM10', 'NO2', 'SO2', 'CO', 'City', 'Timestamp']
+    missing_columns = [col for col in required_columns if col not in df.columns]
+
+    if missing_columns:
+        raise DataValidationError(f"Missing columns in {name}: {', '.join(missing_columns)}")
+
+    # Enhanced preprocessing
+    df['Timestamp'] = pd.to_datetime(df['Timestamp']).dt.tz_localize(None)
+    df = df.dropna(subset=['PM2.5']).sort_values('Timestamp').reset_index(drop=True)
+
+    return apply_schema(derive_columns(df))
+
+def derive_columns(df: pd.DataFrame) -> pd.DataFrame:
+    """Add every derived column of the loaded frame: AQI, risk and calendar fields"""
+    aqi = calculate_aqi(df)
+    df['AQI'] = aqi['AQI']
+    df['Dominant_Pollutant'] = aqi['Dominant_Pollutant']
+    df['Risk_Category'] = categorize_aqi(df['AQI'])
+
+    df['Day'] = pd.Categorical.from_codes(df['Timestamp'].dt.weekday, categories=DAY_NAMES, ordered=True)
+    df['Month'] = df['Timestamp'].dt.month
+    df['Year'] = df['Timestamp'].dt.year
+    return df
+
+def apply_schema(df: pd.DataFrame) -> pd.DataFrame:
+    """Cast columns to the compact dtypes in SCHEMA"""
+    return df.astype({column: dtype for column, dtype in SCHEMA.items() if column in df.columns})
+
+def _concat_frames(frames: List[pd.DataFrame]) -> pd.DataFrame:
+    """Concatenate city frames without losing categorical dtypes"""
+    df = pd.concat(frames, ignore_index=True)
+    for column in ('City', 'Location', 'Dominant_Pollutant'):
+        # Cities have disjoint categories, which pd.concat would widen to strings
+        if column in df.columns and not isinstance(df[column].dtype, pd.CategoricalDtype):
+            df[column] = union_categoricals([frame[column] for frame in frames])
+    return df
+
+def memory_report(df: pd.DataFrame) -> pd.DataFrame:
+    """Report the in-memory footprint of each column, in total and per row"""
+    usage = df.memory_usage(deep=True, index=False)
+    report = pd.DataFrame({
+        'dtype': df.dtypes.astype(str),
+        'bytes': usage,
+        'bytes_per_row': usage / max(len(df), 1)
+    })
+    report.loc['Total'] = ['', usage.sum(), usage.sum() / max(len(df), 1)]
+    return report
+
+def log_memory_report(df: pd.DataFrame):
+    """Log the frame footprint: totals at INFO, per-column breakdown at DEBUG"""
+    report = memory_report(df)
+    total = report.loc['Total']
+    logger.info(
+        f"Frame uses {total['bytes'] / 1e6:.2f} MB for {len(df)} rows "
+        f"({total['bytes_per_row']:.1f} bytes/row)"
+    )
+    logger.debug("Memory by column:\n" + report.to_string(float_format=lambda x: f"{x:.1f}"))
+
+def _read_complete_lines(path: Path, offset: int, size: int = -1) -> Tuple[bytes, int]:
+    """Read from offset up to the last complete line, returning the new offset
+
+    With a size, at most about that many bytes are read, extended to the
+    end of the line they stop in.
+    """
+    with open(path, 'rb') as f:
+        f.seek(offset)
+        data = f.read(size)
+        if size >= 0 and len(data) == size:
+            data += f.readline()
+    # A writer may be midway through a line; leave it for the next refresh
+    end = data.rfind(b'\n') + 1
+    return data[:end], offset + end
+
+def _iter_blocks(path: Path, offset: int):
+    """Yield the complete lines after offset in blocks of about CHUNK_BYTES"""
+    while True:
+        data, offset = _read_complete_lines(path, offset, CHUNK_BYTES)
+        if not data:
+            return
+        yield data, offset
+
+def _prefix_digest(path: Path, offset: int):
+    """SHA-1 of the bytes before offset, which an append leaves untouched
+
+    Returned unfinished, so the appended bytes can be hashed on top of it.
+    """
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        remaining = offset
+        while remaining > 0:
+            block = f.read(min(CHUNK_BYTES, remaining))
+            if not block:
+                break
+            digest.update(block)
+            remaining -= len(block)
+    return digest
+
+def _state_path(path: Path) -> Path:
+    return CACHE_DIR / f"{path.stem}.state.json"
+
+def _load_state(path: Path) -> Optional[dict]:
+    """Load the ingestion state of a source file, if any"""
     try:
-        # Get the absolute path to the data file
-        data_path = 'data/all_cities_aqi_combined.csv'
-        
-        # Modified read_csv with explicit date parsing
-        df = pd.read_csv(
-            data_path,
-            parse_dates=['Timestamp'],
-            dayfirst=True  # This tells pandas that dates are in dd-mm-yyyy format
-        )
-        
-        # Rest of your validation and processing code...
-        required_columns = ['PM2.5', 'PM10', 'NO2', 'SO2', 'CO', 'City', 'Timestamp']
-        missing_columns = [col for col in required_columns if col not in df.columns]
-        
-        if missing_columns:
-            raise DataValidationError(f"Missing columns: {', '.join(missing_columns)}")
-        
-        # Enhanced preprocessing
-        df['Timestamp'] = pd.to_datetime(df['Timestamp']).dt.tz_localize(None)
-        df = df.dropna(subset=['PM2.5'])
-        
-        # Calculate AQI and other processing...
-        df['AQI'] = df['PM2.5'].apply(calculate_aqi)
-        
-        df['Risk_Category'] = pd.cut(
-            df['AQI'],
-            bins=[0, 50, 100, 150, 200, 300, 500],
-            labels=['Good', 'Moderate', 'Unhealthy for Sensitive Groups', 
-                   'Unhealthy', 'Very Unhealthy', 'Hazardous']
-        )
-        
-        df['Day'] = df['Timestamp'].dt.day_name()
-        df['Month'] = df['Timestamp'].dt.month
-        df['Year'] = df['Timestamp'].dt.year
-        
-        if df.empty:
-            raise DataValidationError("No valid data after preprocessing")
-            
-        return df
-        
-    except Exception as e:
-        logger.error(f"Data loading error: {str(e)}")
-        st.error(f"Error loading data: {str(e)}")
+        with open(_state_path(path)) as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        return None
+    parts_dir = CACHE_DIR / path.stem
+    if state.get('pipeline') != PIPELINE_VERSION or not parts_dir.is_dir():
         return None
+    # An interrupted write or compaction leaves a different number of parts
+    if len(list(parts_dir.glob('part-*.parquet'))) != state.get('parts'):
+        return None
+    return state
+
+def _save_state(path: Path, state: dict):
+    tmp_path = _state_path(path).with_suffix(f'.{os.getpid()}.{threading.get_ident()}.tmp')
+    with open(tmp_path, 'w') as f:
+        json.dump(state, f)
+    tmp_path.replace(_state_path(path))
+
+def _write_part(df: pd.DataFrame, parts_dir: Path, part: int):
+    """Write one parquet part of a city cache atomically"""
+    # The dot prefix hides the temporary file from parquet dataset readers
+    tmp_path = parts_dir / f".part-{part:05d}.{os.getpid()}.{threading.get_ident()}.tmp"
+    df.to_parquet(tmp_path, index=False, row_group_size=ROW_GROUP_SIZE)
+    tmp_path.replace(parts_dir / f"part-{part:05d}.parquet")
+
+def _rebuild_cache(city: str, path: Path):
+    """Parse the whole source file into a fresh cache, one part per block
+
+    Blocks are parsed one at a time, so memory stays bounded by the
+    block size however large the file is.
+    """
+    parts_dir = CACHE_DIR / path.stem
+    # Without a state a half-built cache is never trusted
+    _state_path(path).unlink(missing_ok=True)
+    if parts_dir.exists():
+        shutil.rmtree(parts_dir)
+    parts_dir.mkdir(parents=True)
+
+    header_line, offset = _read_complete_lines(path, 0, 0)
+    header = header_line.decode().strip().split(',')
+    digest = hashlib.sha1(header_line)
+    rows, parts, last_timestamp = 0, 0, None
+    for data, offset in _iter_blocks(path, offset):
+        digest.update(data)
+        df = _parse_rows(data, city, path.name, columns=header)
+        if df.empty:
+            continue
+        _write_part(df, parts_dir, parts)
+        rows, parts = rows + len(df), parts + 1
+        last_timestamp = max(last_timestamp or df['Timestamp'].max(), df['Timestamp'].max())
+    if parts == 0:
+        # Keep the schema of an empty file readable
+        _write_part(_parse_rows(header_line, city, path.name), parts_dir, 0)
+        parts = 1
+
+    _save_state(path, {
+        'pipeline': PIPELINE_VERSION,
+        'offset': offset,
+        'mtime_ns': path.stat().st_mtime_ns,
+        'checksum': digest.hexdigest(),
+        'columns': header,
+        'last_timestamp': last_timestamp.isoformat() if last_timestamp is not None else None,
+        'parts': parts
+    })
+    logger.info(f"Rebuilt cache for {path.name} ({rows} rows in {parts} parts)")
+
+def _compact_cache(path: Path, state: dict):
+    """Merge a city cache's parts into one without a window that loses history
+
+    The merged part is written under a hidden name and the state saved
+    before any old part is replaced. Until the last old part is removed
+    the directory holds more parts than the saved state lists, so a crash
+    at any point leads _load_state to a rebuild.
+    """
+    parts_dir = CACHE_DIR / path.stem
+    tmp_path = parts_dir / f".compacted.{os.getpid()}.{threading.get_ident()}.tmp"
+    pd.read_parquet(parts_dir).to_parquet(tmp_path, index=False, row_group_size=ROW_GROUP_SIZE)
+    state['parts'] = 1
+    _save_state(path, state)
+    tmp_path.replace(parts_dir / "part-00000.parquet")
+    for part in parts_dir.glob('part-*.parquet'):
+        if part.name != "part-00000.parquet":
+            part.unlink()
+
+def _append_to_cache(city: str, path: Path, state: dict, digest) -> bool:
+    """Ingest only the rows appended since the last refresh
+
+    digest is the _prefix_digest() of the cached bytes. Returns False when
+    the appended rows are not strictly newer than the cached ones, in which
+    case the cache must be rebuilt. Ingested rows are folded into the
+    latest-reading snapshots of frames read from the cache before.
+    """
+    data, offset = _read_complete_lines(path, state['offset'])
+    digest.update(data)
+    previous_checksum = state['checksum']
+    df, compact = None, False
+    if data:
+        df = _parse_rows(data, city, path.name, columns=state['columns'])
+        last_timestamp = state['last_timestamp'] and pd.Timestamp(state['last_timestamp'])
+        if not df.empty:
+            if last_timestamp is not None and df['Timestamp'].min() <= last_timestamp:
+                return False
+            _write_part(df, CACHE_DIR / path.stem, state['parts'])
+            state['parts'] += 1
+            state['last_timestamp'] = df['Timestamp'].max().isoformat()
+            compact = state['parts'] >= MAX_CACHE_PARTS
+        logger.info(f"Appended {len(df)} rows from {path.name}")
+
+    state.update(
+        offset=offset,
+        mtime_ns=path.stat().st_mtime_ns,
+        checksum=digest.hexdigest()
+    )
+    if compact:
+        _compact_cache(path, state)
+    else:
+        _save_state(path, state)
+    fold_appended(str(path), previous_checksum, state['checksum'], df)
+    return True
+
+@contextmanager
+def _cache_lock(path: Path):
+    """Hold a city's cache exclusively across threads and processes
+
+    Threads of this process share one lock per cache; other processes,
+    such as the report generator next to the dashboard, are kept out by
+    an flock on a lock file beside it. Where no lock file can be created
+    only the thread lock is held, and the cache refresh then fails anyway.
+    """
+    with _CACHE_LOCKS.setdefault(path.stem, threading.Lock()):
+        lock_file = None
+        if fcntl is not None:
+            try:
+                CACHE_DIR.mkdir(parents=True, exist_ok=True)
+                lock_file = open(CACHE_DIR / f"{path.stem}.lock", 'a')
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            except OSError:
+                if lock_file is not None:
+                    lock_file.close()
+                lock_file = None
+        try:
+            yield
+        finally:
+            if lock_file is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+                lock_file.close()
+
+def _refresh_cache(city: str, path: Path) -> bool:
+    """Bring a city's columnar cache up to date with its source file
+
+    Appended rows are ingested incrementally once every byte before the
+    last read offset hashes as it did. A file that shrank, was modified
+    without growing, had any of those bytes changed, or gained older rows
+    is rebuilt from scratch. Returns False if the cache could not be
+    written. Callers hold _cache_lock(path).
+    """
+    try:
+        CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        stat = path.stat()
+        state = _load_state(path)
+
+        if state is not None and stat.st_size == state['offset'] and stat.st_mtime_ns == state['mtime_ns']:
+            return True
+        if state is not None and stat.st_size > state['offset']:
+            digest = _prefix_digest(path, state['offset'])
+            if digest.hexdigest() == state['checksum'] and _append_to_cache(city, path, state, digest):
+                return True
+
+        _rebuild_cache(city, path)
+        return True
+    except (OSError, ImportError) as e:
+        # A read-only deployment or missing parquet engine only costs us the cache
+        logger.warning(f"Could not refresh data cache for {path.name}: {str(e)}")
+        return False
+
+def _date_filters(start_date: Optional[date], end_date: Optional[date]) -> List[tuple]:
+    """Translate an inclusive date range into parquet row filters"""
+    filters = []
+    if start_date is not None:
+        filters.append(('Timestamp', '>=', pd.Timestamp(start_date)))
+    if end_date is not None:
+        filters.append(('Timestamp', '<', pd.Timestamp(end_date) + pd.Timedelta(days=1)))
+    return filters
+
+def read_city(city: str, path: Path, start_date: Optional[date] = None,
+              end_date: Optional[date] = None, columns: Optional[List[str]] = None) -> pd.DataFrame:
+    """Read one city's rows in the date range, refreshing its columnar cache first"""
+    filters = _date_filters(start_date, end_date)
+
+    df, checksum = None, None
+    # Held across the read, so no refresh can rebuild or compact the parts under it
+    with _cache_lock(path):
+        if _refresh_cache(city, path):
+            try:
+                df = pd.read_parquet(CACHE_DIR / path.stem, columns=columns, filters=filters or None)
+                checksum = _load_state(path)['checksum']
+            except Exception as e:
+                logger.warning(f"Ignoring unreadable data cache for {path.name}: {str(e)}")
+
+    if df is None:
+        # No usable cache: parse the whole file and apply the predicates in memory
+        df = _parse_rows(path.read_bytes(), city, path.name)
+        for column, op, value in filters:
+            df = df[df[column] >= value] if op == '>=' else df[df[column] < value]
+        df = df[columns] if columns else df
+
+    # Each part is sorted, but a station file may restart its clock between parts
+    if 'Timestamp' in df.columns and not df['Timestamp'].is_monotonic_increasing:
+        df = df.sort_values('Timestamp', kind='stable', ignore_index=True)
+    # Identifies the cached bytes the rows came from; None when parsed directly
+    df.attrs['cache_checksum'] = checksum
+    return df
+
+def _read_cities(sources: Dict[str, Path], **kwargs) -> List[pd.DataFrame]:
+    """Read several cities concurrently, preserving the input order"""
+    if len(sources) <= 1:
+        return [read_city(city, path, **kwargs) for city, path in sources.items()]
+
+    with ThreadPoolExecutor(max_workers=min(MAX_READ_WORKERS, len(sources))) as pool:
+        futures = [pool.submit(read_city, city, path, **kwargs) for city, path in sources.items()]
+        return [future.result() for future in futures]
+
+def read_catalog(resolution: str = 'daily') -> pd.DataFrame:
+    """List available cities with their first and last reading"""
+    sources = city_sources(resolution)
+    if not sources:
+        raise DataValidationError(f"No city files found in {DATA_DIR}")
+
+    frames = _read_cities(sources, columns=['Timestamp'])
+    return pd.DataFrame({
+        'City': list(sources),
+        'First_Timestamp': [frame['Timestamp'].min() for frame in frames],
+        'Last_Timestamp': [frame['Timestamp'].max() for frame in frames],
+        'Rows': [len(frame) for frame in frames]
+    })
+
+def read_data(cities: Optional[Sequence[str]] = None, start_date: Optional[date] = None,
+              end_date: Optional[date] = None, resolution: str = 'daily') -> pd.DataFrame:
+    """Read preprocessed data for the selected cities and inclusive date range
+
+    Only the matching per-city files of the given resolution are read,
+    from their columnar caches, with the date range pushed down to the
+    parquet reader. The frame is stamped with a data version derived
+    from the source files and the predicates.
+    """
+    start = time.perf_counter()
+    sources = city_sources(resolution)
+    if cities is not None:
+        unknown = [city for city in cities if city not in sources]
+        if unknown:
+            raise DataValidationError(f"Unknown cities: {', '.join(unknown)}")
+        # Sorted cities keep the concatenated frame ordered by (City, Timestamp)
+        sources = {city: sources[city] for city in sorted(cities)}
+
+    if not sources:
+        raise DataValidationError("No cities selected")
+
+    frames = _read_cities(sources, start_date=start_date, end_date=end_date)
+    checksums = {str(path): frame.attrs['cache_checksum'] for path, frame in zip(sources.values(), frames)}
+    # Keep one (possibly empty) frame so an empty selection still has the schema
+    frames = [frame for frame in frames if not frame.empty] or frames[:1]
+    df = _concat_frames(frames)
+
+    predicates = f"{resolution}:{start_date}:{end_date}:{','.join(sources)}"
+    version = hashlib.sha1(
+        f"{source_fingerprint(sources.values())}:{predicates}".encode()
+    ).hexdigest()[:16]
+    df.attrs['data_version'] = version
+    df.attrs['source_fingerprints'] = {city: source_fingerprint([path]) for city, path in sources.items()}
+    df.attrs['source_paths'] = {city: str(path) for city, path in sources.items()}
+    # What src.snapshot needs to carry a snapshot over to the next read after appends
+    df.attrs['loaded_version'] = version
+    df.attrs['cache_checksums'] = checksums
+    df.attrs['date_range'] = (start_date, end_date)
 
+    logger.info(
+        f"Loaded {len(df)} rows for {len(sources)} cities in "
+        f"{(time.perf_counter() - start) * 1000:.1f} ms (version {version})"
+    )
+    log_memory_report(df)
+    return df
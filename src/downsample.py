@@ -0,0 +1,60 @@
+import numpy as np
+import pandas as pd
+from typing import Tuple
+
+# Roughly the pixel width of a full-width chart; more points cannot be told apart
+MAX_POINTS = 1500
+
+# Series are only reduced once they exceed max_points by this factor; below
+# that, trimming saves less than the reduction and the loss of detail cost
+DOWNSAMPLE_FACTOR = 2
+
+def _bucket_edges(length: int, buckets: int) -> np.ndarray:
+    return np.linspace(0, length, buckets + 1).astype(int)
+
+def needs_downsampling(length: int, max_points: int = MAX_POINTS) -> bool:
+    return length > DOWNSAMPLE_FACTOR * max_points
+
+def min_max_positions(y: np.ndarray, buckets: int) -> np.ndarray:
+    """Positions of the first lowest and highest value of each bucket, in order
+
+    y is split into buckets equal spans and reduced in one reduceat pass
+    per extreme, like envelope(), so peaks and troughs survive. The
+    first and last points are always kept; y must be free of NaN and
+    longer than buckets.
+    """
+    length = len(y)
+    starts = _bucket_edges(length, buckets)[:-1]
+    sizes = np.diff(np.append(starts, length))
+    positions = np.arange(length)
+    kept = [np.array([0, length - 1])]
+    for extreme in (np.minimum, np.maximum):
+        values = np.repeat(extreme.reduceat(y, starts), sizes)
+        kept.append(np.minimum.reduceat(np.where(y == values, positions, length), starts))
+    return np.unique(np.concatenate(kept))
+
+def downsample_series(series: pd.Series, max_points: int = MAX_POINTS) -> pd.Series:
+    """Reduce a series to at most max_points, dropping missing values
+
+    Each bucket keeps its lowest and highest point, so a trace drawn
+    from the result looks the same at chart width.
+    """
+    series = series.dropna()
+    if not needs_downsampling(len(series), max_points):
+        return series
+    return series.iloc[min_max_positions(series.to_numpy(dtype='float64'), (max_points - 2) // 2)]
+
+def envelope(low: pd.Series, high: pd.Series, max_points: int = MAX_POINTS) -> Tuple[pd.Series, pd.Series]:
+    """Min/max envelope of a range band over at most max_points buckets
+
+    Each bucket keeps the lowest low and the highest high it covers,
+    stamped at the bucket's first date, so no extreme is lost.
+    """
+    if not needs_downsampling(len(low), max_points):
+        return low, high
+    starts = _bucket_edges(len(low), max_points)[:-1]
+    with np.errstate(invalid='ignore'):
+        lows = np.fmin.reduceat(low.to_numpy(dtype='float64'), starts)
+        highs = np.fmax.reduceat(high.to_numpy(dtype='float64'), starts)
+    dates = low.index[starts]
+    return pd.Series(lows, index=dates, name=low.name), pd.Series(highs, index=dates, name=high.name)
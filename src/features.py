@@ -0,0 +1,63 @@
+import numpy as np
+import pandas as pd
+from functools import cached_property
+from typing import Dict, Sequence
+from src.data_loader import DAY_NAMES
+from src.utils import cached_by_version
+
+SEASONS = ['Winter', 'Spring', 'Summer', 'Fall']
+# Season code of each month, December through February being winter
+_MONTH_TO_SEASON = np.array([0, 0, 1, 1, 1, 2, 2, 2, 3, 3, 3, 0], dtype=np.int8)
+
+FEATURES = ['date', 'weekday', 'month', 'year', 'season', 'day_of_year']
+
+class CalendarFeatures:
+    """Calendar codes of a frame's timestamps
+
+    Each feature is a compact NumPy array computed on first access with
+    datetime64 arithmetic, so frames never need a copy just to carry them.
+    """
+
+    def __init__(self, timestamps: pd.Series):
+        self._timestamps = timestamps.to_numpy(dtype='datetime64[ns]')
+
+    @cached_property
+    def date(self) -> np.ndarray:
+        """Calendar day as datetime64[D]"""
+        return self._timestamps.astype('datetime64[D]')
+
+    @cached_property
+    def weekday(self) -> np.ndarray:
+        """Day of week, 0 = Monday"""
+        # 1970-01-01 was a Thursday
+        return ((self.date.view('int64') + 3) % 7).astype(np.int8)
+
+    @cached_property
+    def month(self) -> np.ndarray:
+        return (self.date.astype('datetime64[M]').view('int64') % 12 + 1).astype(np.int8)
+
+    @cached_property
+    def year(self) -> np.ndarray:
+        return (self.date.astype('datetime64[Y]').view('int64') + 1970).astype(np.int16)
+
+    @cached_property
+    def season(self) -> np.ndarray:
+        """Season code indexing SEASONS"""
+        return _MONTH_TO_SEASON[self.month - 1]
+
+    @cached_property
+    def day_of_year(self) -> np.ndarray:
+        return ((self.date - self.date.astype('datetime64[Y]')).view('int64') + 1).astype(np.int16)
+
+    def labelled(self, name: str) -> pd.Categorical:
+        """Weekday or season codes as an ordered categorical of names"""
+        categories = {'weekday': DAY_NAMES, 'season': SEASONS}[name]
+        return pd.Categorical.from_codes(getattr(self, name), categories=categories, ordered=True)
+
+    def columns(self, names: Sequence[str]) -> Dict[str, np.ndarray]:
+        return {name: getattr(self, name) for name in names}
+
+@cached_by_version(maxsize=16)
+def get_calendar(df: pd.DataFrame) -> CalendarFeatures:
+    """Calendar features of a loaded frame, computed once per data version"""
+    return CalendarFeatures(df['Timestamp'])
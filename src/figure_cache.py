@@ -0,0 +1,99 @@
+import logging
+import threading
+from collections import OrderedDict
+from functools import wraps
+from typing import Callable, Dict, Optional, Tuple
+import pandas as pd
+from src.utils import data_version, derive_version
+
+logger = logging.getLogger(__name__)
+
+MAX_FIGURE_BYTES = 64 * 1024 ** 2
+
+class FigureCache:
+    """LRU cache of built figures bounded by their total serialized size
+
+    Figures are shared across sessions and reruns, so callers must treat
+    a returned figure as read-only.
+    """
+
+    def __init__(self, max_bytes: int = MAX_FIGURE_BYTES):
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, Tuple[object, int]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: str) -> Optional[object]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key: str, figure: object):
+        """Store a figure, evicting the least recently used ones past max_bytes"""
+        size = len(figure.to_json())
+        if size > self.max_bytes:
+            logger.debug(f"Figure {key} ({size} bytes) exceeds the cache and is not kept")
+            return
+        with self._lock:
+            if key in self._entries:
+                self.bytes -= self._entries.pop(key)[1]
+            self._entries[key] = (figure, size)
+            self.bytes += size
+            while self.bytes > self.max_bytes:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self.bytes -= evicted
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'bytes': self.bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+            }
+
+figure_cache = FigureCache()
+
+def cached_figure(kind: str) -> Callable:
+    """Reuse the figure built by func for the same data version and arguments
+
+    The key is a fingerprint of the chart kind, the data version of a
+    leading DataFrame argument (if any) and the remaining arguments.
+    Frames without a data version are never cached. Functions returning
+    None are not cached either.
+    """
+    def decorator(func: Callable) -> Callable:
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if args and isinstance(args[0], pd.DataFrame):
+                version, params = data_version(args[0]), args[1:]
+            else:
+                version, params = 'static', args
+            if version is None:
+                return func(*args, **kwargs)
+
+            key = derive_version(version, kind, repr(params), repr(sorted(kwargs.items())))
+            figure = figure_cache.get(key)
+            if figure is None:
+                figure = func(*args, **kwargs)
+                if figure is not None:
+                    figure_cache.put(key, figure)
+            return figure
+
+        return wrapper
+    return decorator
@@ -3,67 +3,266 @@ import folium
 from folium import plugins
 import streamlit as st
 from streamlit_folium import st_folium
+from folium.utilities import JsCode, image_to_url
+import numpy as np
 import pandas as pd
+from datetime import date
+from typing import Optional, Tuple
+from src.analytics import NO_READING, RISK_BANDS
+from src.aqi import SUB_INDEX_EDGES, sub_index
+from src.profiling import instrumented
+from src.query import get_index
+from src.snapshot import get_snapshot
+from src.spatial import idw_surface, nearest_stations
+from src.stations import REGISTRY_FILE, registry_version, station_coordinates
+from src.utils import cached_by_version
 
-def get_aqi_color(aqi):
-    """Return color based on AQI value"""
-    if aqi <= 50: return 'green'
-    elif aqi <= 100: return 'yellow'
-    elif aqi <= 150: return 'orange'
-    elif aqi <= 200: return 'red'
-    elif aqi <= 300: return 'purple'
-    else: return 'maroon'
-
-def create_map(df: pd.DataFrame):
-    """Create a Folium map with AQI markers"""
+# Marker colour of each band of RISK_BANDS, as in the legend
+BAND_COLORS = [color for _, _, color, _ in RISK_BANDS]
+NO_READING_COLOR = NO_READING.color
+# RGB of BAND_COLORS, for painting the interpolated surface
+BAND_RGB = np.array([[int(color[i:i + 2], 16) for i in (1, 3, 5)] for color in BAND_COLORS], dtype=np.uint8)
+
+# Measures that can be interpolated, and grid cells along the longer side per resolution
+SURFACE_MEASURES = ['PM2.5', 'AQI']
+SURFACE_RESOLUTIONS = {'Coarse': 64, 'Medium': 128, 'Fine': 256}
+SURFACE_OPACITY = 0.5
+NEAREST_STATIONS = 5
+
+MAP_HEIGHT = 600
+# Past this zoom every station is drawn on its own
+CLUSTER_UNTIL_ZOOM = 12
+
+# Clusters take the colour of their worst station rather than their size
+CLUSTER_ICON = """
+function(cluster) {
+    var order = %s;
+    var worst = -1;
+    cluster.getAllChildMarkers().forEach(function(marker) {
+        worst = Math.max(worst, order.indexOf(marker.options.fillColor));
+    });
+    var color = worst >= 0 ? order[worst] : '%s';
+    return L.divIcon({
+        html: '<div style="background-color: ' + color + '; border: 2px solid white; border-radius: 50%%; ' +
+              'width: 36px; height: 36px; line-height: 32px; text-align: center; font-weight: bold; ' +
+              'color: black; opacity: 0.85;">' + cluster.getChildCount() + '</div>',
+        className: '',
+        iconSize: L.point(36, 36)
+    });
+}
+""" % (BAND_COLORS, NO_READING_COLOR)
+
+# Markers take their colour from the feature in the browser, so building
+# the layer costs no Python call per station
+STYLE_FROM_PROPERTIES = JsCode("""
+function(feature, layer) {
+    layer.setStyle({color: feature.properties.color, fillColor: feature.properties.color});
+}
+""")
+
+def _band_range(lower: float, upper: float) -> str:
+    return f"{lower + (lower > 0):.0f}-{upper:.0f}" if np.isfinite(upper) else f">{lower:.0f}"
+
+LEGEND_HTML = (
+    '<div style="position: fixed; bottom: 50px; left: 50px; z-index: 1000; '
+    'background-color: white; padding: 10px; border: 2px solid grey; border-radius: 5px">'
+    '<p><b>AQI Levels</b></p>'
+    + ''.join(
+        f'<p><span style="color: {color};">●</span> {category} ({_band_range(lower, upper)})</p>'
+        for lower, (upper, category, color, _) in zip([0, *[upper for upper, *_ in RISK_BANDS[:-1]]], RISK_BANDS)
+    )
+    + f'<p><span style="color: {NO_READING_COLOR};">●</span> {NO_READING.category}</p>'
+    '</div>'
+)
+
+def risk_bands(aqi: np.ndarray) -> np.ndarray:
+    """Position of each AQI value in RISK_BANDS, or one past the last where there is no reading"""
+    band = np.searchsorted([upper for upper, *_ in RISK_BANDS], aqi, side='left')
+    return np.where(np.isnan(aqi), len(RISK_BANDS), band)
+
+def _display(values: pd.Series) -> np.ndarray:
+    """Values rounded for a popup, with 'N/A' for missing ones"""
+    values = values.astype('float64').round(1)
+    return values.astype(object).where(values.notna(), 'N/A').to_numpy()
+
+@cached_by_version(maxsize=16)
+def station_geojson(df: pd.DataFrame, registry: str) -> dict:
+    """Latest reading of every registered station as one GeoJSON FeatureCollection
+
+    Properties are computed column by column and each feature carries its
+    station name as id and its marker colour; the collection carries its
+    bbox. Stations missing from the registry are left out.
+    registry is the registry_version() the layer is cached under, so
+    edits to the registry file reach the map.
+    """
+    if df.empty or 'Location' not in df.columns:
+        return {'type': 'FeatureCollection', 'features': []}
+
+    latest = get_snapshot(df, by='Location').frame
+    coordinates = station_coordinates(latest['Location'])
+    located = coordinates['Latitude'].notna().to_numpy()
+    latest, coordinates = latest[located], coordinates[located]
+
+    band = risk_bands(latest['AQI'].to_numpy(dtype='float64'))
+    properties = pd.DataFrame({
+        'station': latest['Location'].astype(str).to_numpy(),
+        'city': latest['City'].astype(str).to_numpy(),
+        'aqi': _display(latest['AQI']),
+        'category': np.array([category for _, category, *_ in RISK_BANDS] + [NO_READING.category])[band],
+        'pm25': _display(latest['PM2.5']) if 'PM2.5' in latest.columns else 'N/A',
+        'pm10': _display(latest['PM10']) if 'PM10' in latest.columns else 'N/A',
+        'updated': latest['Timestamp'].dt.strftime('%Y-%m-%d %H:%M').to_numpy(),
+        'color': np.array(BAND_COLORS + [NO_READING_COLOR])[band],
+    })
+    features = [
+        {'type': 'Feature', 'id': station, 'geometry': {'type': 'Point', 'coordinates': [lon, lat]},
+         'properties': props}
+        for station, lon, lat, props in zip(
+            properties['station'],
+            coordinates['Longitude'].tolist(),
+            coordinates['Latitude'].tolist(),
+            properties.to_dict('records')
+        )
+    ]
+    if not features:
+        return {'type': 'FeatureCollection', 'features': []}
+    bbox = [float(coordinates['Longitude'].min()), float(coordinates['Latitude'].min()),
+            float(coordinates['Longitude'].max()), float(coordinates['Latitude'].max())]
+    return {'type': 'FeatureCollection', 'bbox': bbox, 'features': features}
+
+@cached_by_version(maxsize=64)
+def surface_overlay(df: pd.DataFrame, registry: str, day: date, measure: str = 'PM2.5',
+                    cells: int = SURFACE_RESOLUTIONS['Medium']) -> Optional[Tuple[str, list]]:
+    """PNG data URL and bounds of one day's interpolated surface, painted by NAQI band
+
+    Pollutants are banded on SUB_INDEX_EDGES through their sub-index, so
+    the surface and the markers share a colour scale. Rendered once per
+    data version, registry_version(), day, measure and resolution; blank
+    cells are transparent.
+    """
+    surface = idw_surface(df, day, measure, cells)
+    if surface is None:
+        return None
+    aqi = surface.values if measure == 'AQI' else sub_index(surface.values, measure)
+    band = np.searchsorted(SUB_INDEX_EDGES[1:-1], aqi, side='left')
+    painted = ~np.isnan(aqi)
+    rgba = np.zeros(aqi.shape + (4,), dtype=np.uint8)
+    rgba[painted, :3] = BAND_RGB[band[painted]]
+    rgba[painted, 3] = 255
+    return image_to_url(rgba), [[surface.south, surface.west], [surface.north, surface.east]]
+
+@instrumented()
+def create_map(layer: dict, surface: Optional[Tuple[str, list]] = None,
+               surface_name: str = "Interpolated surface") -> Optional[folium.Map]:
+    """Create a Folium map of the stations in a FeatureCollection, clustered by proximity
+
+    Markers are created and styled in the browser from the one GeoJSON
+    layer, so a map of thousands of stations costs little more than their
+    JSON and nothing per station in Python. The map is built fresh each
+    time, because rendering modifies it. A rendered surface from
+    surface_overlay() is laid underneath.
+    """
+    if not layer['features']:
+        return None
+
+    west, south, east, north = layer['bbox']
+    m = folium.Map(location=[(south + north) / 2, (west + east) / 2], zoom_start=4)
+    if len(layer['features']) > 1:
+        m.fit_bounds([[south, west], [north, east]])
+
+    if surface is not None:
+        image, bounds = surface
+        folium.raster_layers.ImageOverlay(image=image, bounds=bounds, opacity=SURFACE_OPACITY,
+                                          name=surface_name).add_to(m)
+
+    clusters = plugins.MarkerCluster(
+        name="Stations",
+        icon_create_function=CLUSTER_ICON,
+        options={'chunkedLoading': True, 'disableClusteringAtZoom': CLUSTER_UNTIL_ZOOM}
+    ).add_to(m)
+    folium.GeoJson(
+        layer,
+        name="Stations",
+        marker=folium.CircleMarker(radius=10, fill=True, fill_opacity=0.8, weight=1),
+        on_each_feature=STYLE_FROM_PROPERTIES,
+        popup=folium.GeoJsonPopup(
+            fields=['station', 'aqi', 'category', 'pm25', 'pm10', 'updated'],
+            aliases=['Station', 'AQI', 'Risk', 'PM2.5', 'PM10', 'Last Updated']
+        ),
+        tooltip=folium.GeoJsonTooltip(fields=['station', 'aqi'], aliases=['Station', 'AQI'])
+    ).add_to(clusters)
+
+    if surface is not None:
+        folium.LayerControl(collapsed=False).add_to(m)
+    m.get_root().html.add_child(folium.Element(LEGEND_HTML))
+    return m
+
+@instrumented('section')
+def show_map(df: pd.DataFrame):
+    """Display the latest AQI of every station on a clustered map"""
     if df.empty:
         st.warning("No data available for map visualization.")
         return
-        
-    if 'Latitude' not in df.columns or 'Longitude' not in df.columns:
-        st.error("Geographical coordinates not found in the data.")
+
+    # Built once per data version; reruns from other widgets reuse it
+    layer = station_geojson(df, registry_version())
+    if not layer['features']:
+        st.error(f"None of the stations in the data have coordinates in {REGISTRY_FILE}.")
         return
-        
-    # Get latest data for each city
-    latest_data = df.loc[df.groupby('City')['Timestamp'].idxmax()]
-    
-    # Create base map centered on mean coordinates
-    center_lat = latest_data['Latitude'].mean()
-    center_lon = latest_data['Longitude'].mean()
-    m = folium.Map(location=[center_lat, center_lon], zoom_start=4)
-    
-    # Add markers for each city
-    for _, row in latest_data.iterrows():
-        color = get_aqi_color(row['AQI'])
-        popup_text = f"""
-            <b>{row['City']}</b><br>
-            AQI: {row['AQI']:.1f}<br>
-            PM2.5: {row.get('PM2.5', 'N/A')}<br>
-            PM10: {row.get('PM10', 'N/A')}<br>
-            Last Updated: {row['Timestamp']}
-        """
-        
-        folium.CircleMarker(
-            location=[row['Latitude'], row['Longitude']],
-            radius=10,
-            popup=folium.Popup(popup_text, max_width=200),
-            color=color,
-            fill=True,
-            fill_color=color
-        ).add_to(m)
-    
-    # Add legend
-    legend_html = (
-        '<div style="position: fixed; bottom: 50px; left: 50px; z-index: 1000; '
-        'background-color: white; padding: 10px; border: 2px solid grey; border-radius: 5px">'
-        '<p><b>AQI Levels</b></p>'
-        '<p><span style="color: green;">●</span> Good (0-50)</p>'
-        '<p><span style="color: yellow;">●</span> Moderate (51-100)</p>'
-        '<p><span style="color: orange;">●</span> Unhealthy for Sensitive Groups (101-150)</p>'
-        '<p><span style="color: red;">●</span> Unhealthy (151-200)</p>'
-        '<p><span style="color: purple;">●</span> Very Unhealthy (201-300)</p>'
-        '<p><span style="color: maroon;">●</span> Hazardous (>300)</p>'
-        '</div>'
+
+    col1, col2, col3 = st.columns([1, 2, 1])
+    show_surface = col1.checkbox("Interpolated surface", value=True)
+    measure = col1.selectbox("Measure", SURFACE_MEASURES, disabled=not show_surface)
+    first_day, last_day = (timestamp.date() for timestamp in get_index(df).date_bounds())
+    if first_day == last_day:
+        # A slider needs two distinct ends
+        day = last_day
+        col2.write(f"Day: {day:%d %b %Y}")
+    else:
+        day = col2.slider(
+            "Day",
+            min_value=first_day,
+            max_value=last_day,
+            value=last_day,
+            disabled=not show_surface
+        )
+    resolution = col3.select_slider(
+        "Resolution",
+        options=list(SURFACE_RESOLUTIONS),
+        value="Medium",
+        disabled=not show_surface
     )
 
-    m.get_root().html.add_child(folium.Element(legend_html))
\ No newline at end of file
+    # Each (day, measure, resolution) is interpolated and rendered once
+    surface = (surface_overlay(df, registry_version(), day, measure, SURFACE_RESOLUTIONS[resolution])
+               if show_surface else None)
+    m = create_map(layer, surface, f"{measure} on {day:%d %b %Y}")
+
+    # Only clicks are returned, so panning and zooming stay in the browser
+    result = st_folium(m, height=MAP_HEIGHT, use_container_width=True, returned_objects=["last_clicked"],
+                       key="station_map")
+
+    if show_surface and surface is None:
+        st.caption(f"No station reported {measure} on {day:%d %b %Y}.")
+    unlocated = len(get_snapshot(df, by='Location')) - len(layer['features'])
+    if unlocated > 0:
+        st.caption(f"{unlocated} stations without coordinates in {REGISTRY_FILE} are not shown.")
+
+    st.write("#### 📍 Nearest Stations")
+    clicked = (result or {}).get("last_clicked")
+    if not clicked:
+        st.caption("Click the map to list the stations nearest to that point.")
+        return
+    nearest = nearest_stations(df, clicked['lat'], clicked['lng'], NEAREST_STATIONS)
+    st.write(f"Nearest stations to {clicked['lat']:.4f}, {clicked['lng']:.4f}")
+    st.dataframe(
+        nearest[['Location', 'City', 'Distance_km', 'AQI', 'Timestamp']],
+        hide_index=True,
+        use_container_width=True,
+        column_config={
+            'Location': 'Station',
+            'Distance_km': st.column_config.NumberColumn('Distance (km)', format="%.1f"),
+            'AQI': st.column_config.NumberColumn('Latest AQI', format="%.1f"),
+            'Timestamp': st.column_config.DatetimeColumn('Last Updated', format="YYYY-MM-DD HH:mm"),
+        }
+    )
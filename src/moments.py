@@ -0,0 +1,221 @@
+import numpy as np
+import pandas as pd
+from itertools import combinations_with_replacement
+from typing import Dict, List, Optional, Sequence, Tuple
+from src.data_loader import POLLUTANTS
+from src.query import CityTimeIndex
+from src.rollup import DateLike
+from src.utils import cached_by_version
+
+# Co-moments kept for every pollutant pair, over rows where both are present
+MOMENTS = ['n', 'sx', 'sy', 'sxx', 'syy', 'sxy']
+
+# City label of regressions pooled over every city
+ALL_CITIES = 'All Cities'
+
+# Padded rows per batch of cells when accumulating moments
+CELL_BLOCK_ROWS = 1 << 18
+
+def _cell_starts(df: pd.DataFrame) -> np.ndarray:
+    """First row of every (City, day) run in a (City, Timestamp) ordered frame"""
+    city = df['City']
+    codes = city.cat.codes.to_numpy() if isinstance(city.dtype, pd.CategoricalDtype) else pd.factorize(city)[0]
+    days = df['Timestamp'].to_numpy().astype('datetime64[D]')
+    changes = (codes[1:] != codes[:-1]) | (days[1:] != days[:-1])
+    return np.concatenate([[0], np.flatnonzero(changes) + 1])
+
+def _cell_moments(values: np.ndarray, valid: np.ndarray, starts: np.ndarray) -> Dict[str, np.ndarray]:
+    """Co-moments of every upper-triangle pollutant pair per cell of rows
+
+    With X the values (zero where missing) and M the presence mask, a
+    cell's moments are X'M, (X^2)'M, X'X and M'M. Cells are padded with
+    absent rows into (cells, rows, pollutants) blocks so the products run
+    as batched matrix multiplications, CELL_BLOCK_ROWS padded rows at a time.
+    """
+    k = values.shape[1]
+    upper_i, upper_j = np.triu_indices(k)
+    lengths = np.diff(np.append(starts, len(values)))
+    result = {moment: np.empty((len(starts), len(upper_i))) for moment in MOMENTS}
+
+    first = 0
+    while first < len(starts):
+        # Take as many cells as fit the row budget once padded to the longest
+        width = lengths[first]
+        last = first + 1
+        while last < len(starts) and max(width, lengths[last]) * (last + 1 - first) <= CELL_BLOCK_ROWS:
+            width = max(width, lengths[last])
+            last += 1
+
+        rows = slice(starts[first], starts[last - 1] + lengths[last - 1])
+        x = np.zeros((last - first, width, k))
+        m = np.zeros((last - first, width, k))
+        if (lengths[first:last] == width).all():
+            x[:] = values[rows].reshape(x.shape)
+            m[:] = valid[rows].reshape(m.shape)
+        else:
+            cell = np.repeat(np.arange(last - first), lengths[first:last])
+            flat = cell * width + np.arange(rows.stop - rows.start) - (starts[first:last] - starts[first])[cell]
+            x.reshape(-1, k)[flat] = values[rows]
+            m.reshape(-1, k)[flat] = valid[rows]
+
+        xt, mt = x.transpose(0, 2, 1), m.transpose(0, 2, 1)
+        xm = xt @ m           # sum of x_i over rows where j is present
+        xxm = (xt * xt) @ m   # sum of x_i^2 over rows where j is present
+        xx = xt @ x
+        mm = mt @ m
+        block = slice(first, last)
+        result['n'][block] = mm[:, upper_i, upper_j]
+        result['sx'][block] = xm[:, upper_i, upper_j]
+        result['sy'][block] = xm[:, upper_j, upper_i]
+        result['sxx'][block] = xxm[:, upper_i, upper_j]
+        result['syy'][block] = xxm[:, upper_j, upper_i]
+        result['sxy'][block] = xx[:, upper_i, upper_j]
+        first = last
+    return result
+
+class PairMoments:
+    """Pairwise co-moments of the pollutants per (City, day)
+
+    Each cell holds, for every pollutant pair, the count of rows where
+    both are present and the sums, sums of squares and cross-product over
+    those rows, so pandas' pairwise-complete correlation of any city set
+    and date range is the sum of the selected cells, with no raw rows.
+    Values are shifted by each pollutant's overall mean first, which
+    leaves covariances unchanged and keeps the sums well conditioned.
+    """
+
+    def __init__(self, df: pd.DataFrame, measures: Optional[Sequence[str]] = None):
+        index = CityTimeIndex(df)
+        df = index.df
+        self.measures: List[str] = [m for m in (measures or POLLUTANTS) if m in df.columns]
+        self.pairs: List[Tuple[str, str]] = list(combinations_with_replacement(self.measures, 2))
+
+        values = df[self.measures].to_numpy(dtype='float64')
+        valid = ~np.isnan(values)
+        with np.errstate(invalid='ignore'):
+            self.shift = np.where(valid.any(axis=0), np.nanmean(np.where(valid, values, np.nan), axis=0), 0) \
+                if len(df) else np.zeros(len(self.measures))
+        values = np.where(valid, values - self.shift, 0)
+
+        starts = _cell_starts(df) if len(df) else np.array([], dtype=int)
+        columns = {'City': df['City'].iloc[starts].to_numpy().astype(str),
+                   'Timestamp': df['Timestamp'].to_numpy()[starts].astype('datetime64[D]').astype('datetime64[ns]')}
+        moments = _cell_moments(values, valid, starts)
+        for p, (x, y) in enumerate(self.pairs):
+            for moment in MOMENTS:
+                columns[f"{x}|{y}|{moment}"] = moments[moment][:, p]
+        self.daily = pd.DataFrame(columns)
+        self._index = CityTimeIndex(self.daily)
+
+    @property
+    def cities(self) -> List[str]:
+        return self._index.cities
+
+    def totals(self, cities: Optional[Sequence[str]] = None, start_date: Optional[DateLike] = None,
+               end_date: Optional[DateLike] = None) -> pd.Series:
+        """Summed moments of the selected cells, one entry per pair and moment"""
+        cells = self._index.query(cities, start_date, end_date)
+        return cells.drop(columns=['City', 'Timestamp']).sum()
+
+    def _statistics(self, moments: np.ndarray) -> Dict[str, np.ndarray]:
+        """Count, means, variances and covariance from summed moments of shape (..., pairs, moments)
+
+        Variances and covariance use ddof=1, as pandas does.
+        """
+        n, sx, sy, sxx, syy, sxy = np.moveaxis(moments, -1, 0)
+        position = {m: i for i, m in enumerate(self.measures)}
+        shift_x = self.shift[[position[x] for x, _ in self.pairs]]
+        shift_y = self.shift[[position[y] for _, y in self.pairs]]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean_x, mean_y = sx / n, sy / n
+            var_x = (sxx - n * mean_x ** 2) / (n - 1)
+            var_y = (syy - n * mean_y ** 2) / (n - 1)
+            cov = (sxy - n * mean_x * mean_y) / (n - 1)
+        return {
+            'n': n,
+            'mean_x': mean_x + shift_x,
+            'mean_y': mean_y + shift_y,
+            'var_x': np.clip(var_x, 0, None),
+            'var_y': np.clip(var_y, 0, None),
+            'cov': cov,
+        }
+
+    def pair_statistics(self, totals: pd.Series) -> pd.DataFrame:
+        """Count, means, variances and covariance of every pair from summed moments"""
+        stats = self._statistics(totals.to_numpy().reshape(len(self.pairs), len(MOMENTS)))
+        stats['n'] = stats['n'].astype(int)
+        return pd.DataFrame({
+            'x': [x for x, _ in self.pairs],
+            'y': [y for _, y in self.pairs],
+            **stats,
+        })
+
+    def regressions(self, start_date: Optional[DateLike] = None,
+                    end_date: Optional[DateLike] = None) -> pd.DataFrame:
+        """Least-squares fit of Y on X for every pollutant pair, per city and over all cities
+
+        Every fit comes from the same per-city sums of the daily cells in
+        one vectorized pass, matching scipy.stats.linregress on the rows
+        where both pollutants are present. Rows for all cities pooled
+        together carry ALL_CITIES as their City.
+        """
+        # scipy.stats is slow to import and only needed for the p-values
+        from scipy.stats import t as student_t
+        cells = self._index.query(None, start_date, end_date)
+        per_city = cells.drop(columns='Timestamp').groupby('City', sort=True).sum()
+        per_city.loc[ALL_CITIES] = per_city.sum()
+        stats = self._statistics(per_city.to_numpy().reshape(len(per_city), len(self.pairs), len(MOMENTS)))
+
+        off_diagonal = np.array([x != y for x, y in self.pairs])
+        frames = []
+        # Each unordered pair gives both regressions, Y on X and X on Y
+        for flip in (False, True):
+            mean_x, mean_y = (stats['mean_y'], stats['mean_x']) if flip else (stats['mean_x'], stats['mean_y'])
+            var_x, var_y = (stats['var_y'], stats['var_x']) if flip else (stats['var_x'], stats['var_y'])
+            n, cov = stats['n'], stats['cov']
+            with np.errstate(invalid='ignore', divide='ignore'):
+                slope = cov / var_x
+                r = np.clip(cov / np.sqrt(var_x * var_y), -1, 1)
+                dof = n - 2
+                t = r * np.sqrt(dof / ((1 - r) * (1 + r)))
+                p_value = np.where(dof > 0, 2 * student_t.sf(np.abs(t), np.maximum(dof, 1)), np.nan)
+            cities = np.repeat(per_city.index.to_numpy(), len(self.pairs))
+            frames.append(pd.DataFrame({
+                'City': cities,
+                'X': np.tile([y if flip else x for x, y in self.pairs], len(per_city)),
+                'Y': np.tile([x if flip else y for x, y in self.pairs], len(per_city)),
+                'n': n.ravel().astype(int),
+                'slope': slope.ravel(),
+                'intercept': (mean_y - slope * mean_x).ravel(),
+                'r': r.ravel(),
+                'r_squared': (r ** 2).ravel(),
+                'p_value': p_value.ravel(),
+            })[np.tile(off_diagonal, len(per_city))])
+        return pd.concat(frames, ignore_index=True)
+
+    def correlation(self, measures: Optional[Sequence[str]] = None, cities: Optional[Sequence[str]] = None,
+                    start_date: Optional[DateLike] = None, end_date: Optional[DateLike] = None) -> pd.DataFrame:
+        """Pairwise-complete Pearson correlation matrix, like DataFrame.corr()"""
+        measures = list(measures or self.measures)
+        stats = self.pair_statistics(self.totals(cities, start_date, end_date))
+        with np.errstate(invalid='ignore', divide='ignore'):
+            stats['r'] = np.clip(stats['cov'] / np.sqrt(stats['var_x'] * stats['var_y']), -1, 1)
+        # Diagonal entries are 1 wherever a pollutant varies
+        stats.loc[stats['x'] == stats['y'], 'r'] = np.where(
+            stats.loc[stats['x'] == stats['y'], 'var_x'] > 0, 1.0, np.nan)
+
+        matrix = pd.DataFrame(np.nan, index=measures, columns=measures)
+        for x, y, r in stats[['x', 'y', 'r']].itertuples(index=False):
+            if x in matrix.index and y in matrix.index:
+                matrix.loc[x, y] = matrix.loc[y, x] = r
+        return matrix
+
+@cached_by_version(maxsize=16)
+def get_regressions(df: pd.DataFrame) -> pd.DataFrame:
+    """Regression table of every pollutant pair and city, computed once per data version"""
+    return get_moments(df).regressions()
+
+@cached_by_version(maxsize=8)
+def get_moments(df: pd.DataFrame) -> PairMoments:
+    """Build the pollutant co-moments of a loaded frame once per data version"""
+    return PairMoments(df)
@@ -0,0 +1,168 @@
+import contextvars
+import json
+import logging
+import os
+import threading
+import time
+import tracemalloc
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+from functools import wraps
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Profiling is on for every run with this variable set, or for one
+# session when its URL carries ?profile=1
+ENV_VAR = 'AQI_PROFILE'
+QUERY_PARAM = 'profile'
+LOG_PATH = Path(os.environ.get('AQI_PROFILE_LOG', 'logs/profile.jsonl'))
+
+_TRUE = {'1', 'true', 'yes', 'on'}
+
+# Records of the run being profiled in this thread; None when profiling is off
+_run: contextvars.ContextVar[Optional[dict]] = contextvars.ContextVar('profile_run', default=None)
+_log_lock = threading.Lock()
+# Runs being profiled; tracemalloc slows every allocation, so it only
+# traces while there is at least one
+_tracing_runs = 0
+_tracing_lock = threading.Lock()
+
+def profiling_requested(query_value: Optional[str] = None) -> bool:
+    """Whether the environment or a query parameter value asks for profiling"""
+    return (os.environ.get(ENV_VAR, '').lower() in _TRUE
+            or (query_value or '').lower() in _TRUE)
+
+def start_run(label: str = 'rerun'):
+    """Start recording the sections of this rerun
+
+    Peak allocations come from tracemalloc, which is process wide, so
+    they are only exact while a single session is being profiled.
+    """
+    global _tracing_runs
+    if _run.get() is not None:
+        finish_run()
+    with _tracing_lock:
+        _tracing_runs += 1
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+    _run.set({'id': uuid.uuid4().hex[:12], 'label': label, 'started': time.perf_counter(),
+              'records': [], 'stack': []})
+
+def finish_run() -> List[dict]:
+    """Stop recording, append the run's records to the log and return them"""
+    global _tracing_runs
+    run = _run.get()
+    if run is None:
+        return []
+    _run.set(None)
+    with _tracing_lock:
+        _tracing_runs -= 1
+        if not _tracing_runs:
+            tracemalloc.stop()
+    recorded = datetime.now().isoformat(timespec='seconds')
+    try:
+        LOG_PATH.parent.mkdir(parents=True, exist_ok=True)
+        with _log_lock, open(LOG_PATH, 'a') as log:
+            for record in run['records']:
+                log.write(json.dumps({'run': run['id'], 'label': run['label'], 'recorded': recorded, **record}) + '\n')
+    except OSError as e:
+        logger.warning(f"Could not write the profile log {LOG_PATH}: {str(e)}")
+    return run['records']
+
+def count_rows(value) -> Optional[int]:
+    """Rows of a frame or series, or points plotted in a figure"""
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        return len(value)
+    traces = getattr(value, 'data', None)
+    if isinstance(traces, tuple):
+        points = [len(trace.x) for trace in traces if getattr(trace, 'x', None) is not None]
+        return sum(points) if points else None
+    return None
+
+@contextmanager
+def profiled(name: str, kind: str = 'step', rows_in: Optional[int] = None):
+    """Record the wall time and peak allocation of the enclosed block
+
+    Yields the record, or None when profiling is off, so the block can
+    set its 'rows_out'. Nested blocks are recorded at their depth and
+    count towards their parent's peak.
+    """
+    run = _run.get()
+    if run is None:
+        yield None
+        return
+
+    stack = run['stack']
+    if stack:
+        stack[-1]['peak'] = max(stack[-1]['peak'], tracemalloc.get_traced_memory()[1])
+    tracemalloc.reset_peak()
+    current = tracemalloc.get_traced_memory()[0]
+    frame = {'base': current, 'peak': current}
+    record = {'name': name, 'kind': kind, 'depth': len(stack), 'rows_in': rows_in, 'rows_out': None,
+              'offset_ms': (time.perf_counter() - run['started']) * 1000}
+    stack.append(frame)
+    run['records'].append(record)
+    started = time.perf_counter()
+    try:
+        yield record
+    finally:
+        record['wall_ms'] = (time.perf_counter() - started) * 1000
+        stack.pop()
+        peak = max(frame['peak'], tracemalloc.get_traced_memory()[1])
+        record['peak_kb'] = (peak - frame['base']) / 1024
+        if stack:
+            stack[-1]['peak'] = max(stack[-1]['peak'], peak)
+
+def instrumented(kind: str = 'figure', name: Optional[str] = None) -> Callable:
+    """Profile every call of func; a plain call when profiling is off
+
+    Rows in are those of a leading DataFrame argument, rows out those
+    of the returned frame or the points of the returned figure.
+    """
+    def decorator(func: Callable) -> Callable:
+        label = name or func.__name__
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if _run.get() is None:
+                return func(*args, **kwargs)
+            rows_in = len(args[0]) if args and isinstance(args[0], pd.DataFrame) else None
+            with profiled(label, kind, rows_in) as record:
+                result = func(*args, **kwargs)
+                record['rows_out'] = count_rows(result)
+            return result
+        return wrapper
+    return decorator
+
+def show_profile_panel(records: List[dict], cache_stats: Optional[Dict[str, int]] = None):
+    """Show the recorded sections of this rerun in a collapsed panel"""
+    import streamlit as st
+
+    with st.expander("⏱️ Performance profile"):
+        if not records:
+            st.write("Nothing was recorded in this run.")
+            return
+        table = pd.DataFrame(records)
+        table['name'] = ['· ' * depth + name for depth, name in zip(table['depth'], table['name'])]
+        total = table.loc[table['depth'] == 0, 'wall_ms'].sum()
+        st.write(f"Profiled sections took {total:,.0f} ms. Records are appended to `{LOG_PATH}`.")
+        st.dataframe(
+            table[['name', 'kind', 'wall_ms', 'rows_in', 'rows_out', 'peak_kb']],
+            hide_index=True,
+            use_container_width=True,
+            column_config={
+                'name': 'Section',
+                'kind': 'Kind',
+                'wall_ms': st.column_config.NumberColumn('Wall time (ms)', format="%.1f"),
+                'rows_in': st.column_config.NumberColumn('Rows in', format="%d"),
+                'rows_out': st.column_config.NumberColumn('Rows out', format="%d"),
+                'peak_kb': st.column_config.NumberColumn('Peak allocation (KiB)', format="%.0f"),
+            }
+        )
+        if cache_stats:
+            st.write("Figure cache")
+            st.json(cache_stats)
@@ -0,0 +1,115 @@
+import numpy as np
+import pandas as pd
+from datetime import date
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+from src.utils import cached_by_version, data_version, derive_version
+
+DateLike = Union[date, pd.Timestamp, str]
+
+class CityTimeIndex:
+    """Sorted (City, Timestamp) index answering city/date slices by binary search
+
+    Each city occupies one contiguous block of rows, so a query is two
+    searchsorted calls per city on the datetime64 column followed by
+    positional slicing, with no per-row boolean mask.
+    """
+
+    def __init__(self, df: pd.DataFrame):
+        bounds = self._city_bounds(df)
+        if bounds is None:
+            df = df.sort_values(['City', 'Timestamp'], kind='stable').reset_index(drop=True)
+            bounds = self._city_bounds(df)
+        self.df = df
+        self._timestamps = df['Timestamp'].to_numpy()
+        self._bounds = bounds
+
+    @staticmethod
+    def _city_bounds(df: pd.DataFrame) -> Optional[Dict[str, Tuple[int, int]]]:
+        """Locate the [start, stop) row block of every city
+
+        Returns None unless every city is one contiguous block with
+        non-decreasing timestamps.
+        """
+        if df.empty:
+            return {}
+        city = df['City']
+        if isinstance(city.dtype, pd.CategoricalDtype):
+            codes = city.cat.codes.to_numpy()
+        else:
+            codes = pd.factorize(city)[0]
+        timestamps = df['Timestamp'].to_numpy()
+
+        changes = np.flatnonzero(codes[1:] != codes[:-1]) + 1
+        starts = np.concatenate([[0], changes])
+        stops = np.concatenate([changes, [len(df)]])
+        if len(np.unique(codes[starts])) != len(starts):
+            return None
+
+        descending = timestamps[1:] < timestamps[:-1]
+        descending[changes - 1] = False  # a new city may start earlier
+        if descending.any():
+            return None
+
+        return {str(city.iat[start]): (int(start), int(stop)) for start, stop in zip(starts, stops)}
+
+    @property
+    def cities(self) -> List[str]:
+        return list(self._bounds)
+
+    def date_bounds(self, cities: Optional[Sequence[str]] = None) -> Tuple[Optional[pd.Timestamp], Optional[pd.Timestamp]]:
+        """First and last timestamp across the given cities"""
+        blocks = [self._bounds[city] for city in (cities or self.cities) if city in self._bounds]
+        if not blocks:
+            return None, None
+        first = min(self._timestamps[start] for start, _ in blocks)
+        last = max(self._timestamps[stop - 1] for _, stop in blocks)
+        return pd.Timestamp(first), pd.Timestamp(last)
+
+    def _row_range(self, city: str, start: Optional[np.datetime64], end: Optional[np.datetime64]) -> Tuple[int, int]:
+        """Binary-search the rows of one city within [start, end)"""
+        lo, hi = self._bounds[city]
+        block = self._timestamps[lo:hi]
+        first = lo + int(np.searchsorted(block, start, side='left')) if start is not None else lo
+        last = lo + int(np.searchsorted(block, end, side='left')) if end is not None else hi
+        return first, max(first, last)
+
+    def query(self, cities: Optional[Sequence[str]] = None, start_date: Optional[DateLike] = None,
+              end_date: Optional[DateLike] = None) -> pd.DataFrame:
+        """Return the rows of the given cities within an inclusive date range
+
+        A selection that maps to one contiguous block (a single city, or
+        adjacent whole cities) is returned as a positional slice of the
+        indexed frame; otherwise the per-city slices are concatenated.
+        """
+        selected = [city for city in (cities if cities is not None else self.cities) if city in self._bounds]
+        start = np.datetime64(pd.Timestamp(start_date)) if start_date is not None else None
+        end = (np.datetime64(pd.Timestamp(end_date).normalize() + pd.Timedelta(days=1))
+               if end_date is not None else None)
+
+        ranges = sorted(self._row_range(city, start, end) for city in selected)
+        # Merge touching ranges so whole-city selections stay one slice
+        merged: List[List[int]] = []
+        for first, last in ranges:
+            if first == last:
+                continue
+            if merged and merged[-1][1] == first:
+                merged[-1][1] = last
+            else:
+                merged.append([first, last])
+
+        if not merged:
+            result = self.df.iloc[0:0]
+        elif len(merged) == 1:
+            result = self.df.iloc[merged[0][0]:merged[0][1]]
+        else:
+            result = pd.concat([self.df.iloc[first:last] for first, last in merged])
+
+        result.attrs['data_version'] = derive_version(
+            data_version(self.df), 'query', ','.join(selected), start_date, end_date
+        )
+        return result
+
+@cached_by_version(maxsize=16)
+def get_index(df: pd.DataFrame) -> CityTimeIndex:
+    """Build the (City, Timestamp) index of a loaded frame once per data version"""
+    return CityTimeIndex(df)
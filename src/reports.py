@@ -0,0 +1,267 @@
+"""Daily per-city air-quality bulletins as standalone HTML, with a JSON summary
+
+Every city gets one page with its health-risk gauge, the historical
+trend of the last days, the monthly trend of its latest year and the
+pollutant correlation heatmap, plus the latest reading of each station.
+Cities are rendered in a process pool from one shared load of the data:
+
+    python -m src.reports --out reports
+    python -m src.reports --out reports --since            # cities with data newer than the last run
+    python -m src.reports --out reports --since 2024-06-01 # cities with data on or after a date
+"""
+import argparse
+import html
+import json
+import logging
+import math
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+import pandas as pd
+from src.analytics import (aqi_summary, create_correlation_heatmap, create_gauge_chart, create_historical_trend,
+                           create_monthly_trend, current_status, station_status, strongest_relationships)
+from src.data_loader import POLLUTANTS, read_catalog, read_data
+from src.moments import get_regressions
+from src.query import get_index
+from src.rolling import city_grid
+
+logger = logging.getLogger(__name__)
+
+SUMMARY_FILE = 'summary.json'
+TREND_DAYS = 30
+# Pages embed plotly.js by default so each opens on its own; 'directory'
+# writes one shared plotly.min.js next to them and 'cdn' links to it
+PLOTLYJS_MODES = {'inline': True, 'directory': 'directory', 'cdn': 'cdn'}
+
+# Frame every worker reports from: inherited from the parent when workers
+# are forked, read once per worker from the columnar caches otherwise
+_dataset: Optional[pd.DataFrame] = None
+
+PAGE = """<!DOCTYPE html>
+<html lang="en">
+<head>
+<meta charset="utf-8">
+<title>{title}</title>
+<style>
+body {{ font-family: sans-serif; margin: 2em auto; max-width: 1100px; }}
+.risk {{ padding: 10px; border-radius: 5px; border: 1px solid {color}; }}
+table {{ border-collapse: collapse; }}
+td, th {{ padding: 4px 12px; text-align: left; border-bottom: 1px solid #ddd; }}
+</style>
+</head>
+<body>
+<h1>{title}</h1>
+<div class="risk">
+<p style="color: {color};"><b>{category}</b>, AQI {aqi:.1f} on {timestamp}</p>
+<p><small>{advice}</small></p>
+</div>
+{figures}
+<h2>Stations</h2>
+<table>
+<tr><th>Station</th><th>Latest reading</th><th>AQI</th><th>Risk</th></tr>
+{stations}
+</table>
+<p><small>Generated {generated}</small></p>
+</body>
+</html>
+"""
+
+def report_filename(city: str) -> str:
+    return city.lower().replace(' ', '_') + '.html'
+
+def _number(value, digits: int = 1) -> Optional[float]:
+    """Plain rounded float for the summary; missing values become null"""
+    value = float(value)
+    return None if math.isnan(value) else round(value, digits)
+
+def _init_worker(cities: Sequence[str], resolution: str):
+    global _dataset
+    if _dataset is None:
+        _dataset = read_data(cities, resolution=resolution)
+
+def render_city(city: str, out: str, days: int = TREND_DAYS, plotlyjs: str = 'inline') -> dict:
+    """Write the bulletin page of one city and return its summary entry"""
+    df = _dataset
+    index = get_index(df)
+    city_df = index.query([city])
+    status = current_status(city_df).cities[0]
+    last = status.timestamp.date()
+    recent = index.query([city], last - timedelta(days=days), last)
+    pollutants = [pollutant for pollutant in POLLUTANTS if pollutant in df.columns]
+
+    figures = [
+        create_gauge_chart(status.aqi),
+        create_historical_trend(recent, city),
+        create_monthly_trend(city_df, start_date=date(last.year, 1, 1), end_date=date(last.year, 12, 31)),
+        create_correlation_heatmap(df, pollutants, [city]),
+    ]
+    # Only the first figure carries plotly.js; the rest of the page reuses it
+    include = PLOTLYJS_MODES[plotlyjs]
+    parts = []
+    for figure in figures:
+        if figure is not None:
+            parts.append(figure.to_html(full_html=False, include_plotlyjs=include))
+            include = False
+
+    stations = station_status(city_df)
+    rows = "\n".join(
+        f"<tr><td>{html.escape(station.station)}</td><td>{station.timestamp:%Y-%m-%d %H:%M}</td>"
+        f"<td>{station.aqi:.1f}</td><td>{html.escape(station.risk.category)}</td></tr>"
+        for station in stations
+    )
+    path = Path(out) / report_filename(city)
+    tmp_path = path.with_suffix(f'.{os.getpid()}.tmp')
+    tmp_path.write_text(PAGE.format(
+        title=html.escape(f"Air Quality Bulletin - {city}"),
+        color=status.risk.color,
+        category=html.escape(status.risk.category),
+        aqi=status.aqi,
+        timestamp=f"{status.timestamp:%Y-%m-%d %H:%M}",
+        advice=html.escape(status.risk.advice),
+        figures="\n".join(parts),
+        stations=rows,
+        generated=datetime.now().isoformat(timespec='seconds'),
+    ), encoding='utf-8')
+    tmp_path.replace(path)
+
+    summary = aqi_summary(recent)
+    relationships = strongest_relationships(df, city)
+    strongest = relationships.iloc[0] if not relationships.empty else None
+    return {
+        'city': city,
+        'file': path.name,
+        'last_timestamp': status.timestamp.isoformat(),
+        'aqi': _number(status.aqi),
+        'category': status.risk.category,
+        'alert': status.alert,
+        'recent': {'days': days, 'average': _number(summary.average), 'maximum': _number(summary.maximum),
+                   'minimum': _number(summary.minimum)},
+        'strongest_relationship': None if strongest is None else {
+            'x': strongest['X'], 'y': strongest['Y'], 'r': _number(strongest['r'], 3)
+        },
+        'stations': [
+            {'station': station.station, 'last_timestamp': station.timestamp.isoformat(),
+             'aqi': _number(station.aqi), 'category': station.risk.category}
+            for station in stations
+        ],
+    }
+
+def load_summary(out: Path) -> Dict[str, dict]:
+    """Entries of the previous run's summary by city, if there was one"""
+    try:
+        previous = json.loads((out / SUMMARY_FILE).read_text())
+    except (OSError, ValueError):
+        return {}
+    return {entry['city']: entry for entry in previous.get('cities', [])}
+
+def stale_cities(catalog: pd.DataFrame, out: Path, previous: Dict[str, dict],
+                 since: Optional[str]) -> List[str]:
+    """Cities whose pages need rendering: all of them unless --since narrows it
+
+    Since a date, a city is stale when it has readings on or after that
+    date; since the previous run, when its latest reading is newer than
+    the one that run reported. Cities missing a page are always stale.
+    """
+    stale = []
+    for city, last in zip(catalog['City'], catalog['Last_Timestamp']):
+        if pd.isna(last):
+            continue
+        entry = previous.get(city)
+        if since is None or entry is None or 'error' in entry or not (out / entry['file']).exists():
+            stale.append(city)
+        elif since == 'previous':
+            if last > pd.Timestamp(entry['last_timestamp']):
+                stale.append(city)
+        elif last >= pd.Timestamp(since):
+            stale.append(city)
+    return stale
+
+def generate_reports(out: Path, cities: Optional[Sequence[str]] = None, resolution: str = 'daily',
+                     since: Optional[str] = None, workers: Optional[int] = None,
+                     days: int = TREND_DAYS, plotlyjs: str = 'inline') -> dict:
+    """Render the pages of every stale city in parallel and write the summary"""
+    global _dataset
+    out.mkdir(parents=True, exist_ok=True)
+    catalog = read_catalog(resolution)
+    # Pages of cities outside --cities stay listed; those of removed cities are dropped
+    previous = load_summary(out)
+    entries = {city: entry for city, entry in previous.items() if city in set(catalog['City'])}
+    if cities:
+        catalog = catalog[catalog['City'].isin(cities)]
+    selected = stale_cities(catalog, out, previous, since)
+    logger.info(f"Rendering {len(selected)} of {len(catalog)} cities")
+
+    if selected:
+        if plotlyjs == 'directory':
+            from plotly.offline import get_plotlyjs
+            (out / 'plotly.min.js').write_text(get_plotlyjs(), encoding='utf-8')
+
+        # Load once and build the shared per-version artifacts before
+        # forking, so every worker starts from them instead of recomputing
+        _dataset = read_data(selected, resolution=resolution)
+        get_index(_dataset)
+        get_regressions(_dataset)
+        city_grid(_dataset)
+
+        start_methods = multiprocessing.get_all_start_methods()
+        context = multiprocessing.get_context('fork' if 'fork' in start_methods else None)
+        with ProcessPoolExecutor(max_workers=min(workers or os.cpu_count() or 1, len(selected)), mp_context=context,
+                                 initializer=_init_worker, initargs=(selected, resolution)) as pool:
+            futures = {pool.submit(render_city, city, str(out), days, plotlyjs): city for city in selected}
+            for future in as_completed(futures):
+                city = futures[future]
+                try:
+                    entries[city] = future.result()
+                except Exception as e:
+                    logger.error(f"Report generation error for {city}: {str(e)}")
+                    entries[city] = {'city': city, 'error': str(e)}
+
+    report = {
+        'generated': datetime.now().isoformat(timespec='seconds'),
+        'resolution': resolution,
+        'rendered': sorted(selected),
+        'alerts': sorted(city for city, entry in entries.items() if entry.get('alert')),
+        'cities': [entries[city] for city in sorted(entries)],
+    }
+    tmp_path = out / f"{SUMMARY_FILE}.tmp"
+    tmp_path.write_text(json.dumps(report, indent=2))
+    tmp_path.replace(out / SUMMARY_FILE)
+    return report
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--out', type=Path, required=True, help="directory for the pages and summary.json")
+    parser.add_argument('--cities', nargs='+', help="report only these cities")
+    parser.add_argument('--resolution', choices=['daily', 'hourly'], default='daily')
+    parser.add_argument('--since', nargs='?', const='previous',
+                        help="render only cities with readings on or after this date, "
+                             "or newer than the previous run when no date is given")
+    parser.add_argument('--workers', type=int, help="worker processes; defaults to the CPU count")
+    parser.add_argument('--days', type=int, default=TREND_DAYS, help="days shown in the historical trend")
+    parser.add_argument('--plotlyjs', choices=PLOTLYJS_MODES, default='inline',
+                        help="embed plotly.js in every page, share one copy in the directory, or load it from a CDN")
+    args = parser.parse_args()
+
+    if args.since not in (None, 'previous'):
+        try:
+            date.fromisoformat(args.since)
+        except ValueError:
+            parser.error(f"--since expects a YYYY-MM-DD date, not {args.since}")
+
+    started = time.perf_counter()
+    report = generate_reports(args.out, args.cities, args.resolution, args.since,
+                              args.workers, args.days, args.plotlyjs)
+    failed = [entry['city'] for entry in report['cities'] if 'error' in entry]
+    print(f"Rendered {len(report['rendered'])} of {len(report['cities'])} cities "
+          f"in {time.perf_counter() - started:.1f}s to {args.out}")
+    if failed:
+        print(f"Failed: {', '.join(failed)}")
+    raise SystemExit(1 if failed else 0)
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
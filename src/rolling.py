@@ -0,0 +1,112 @@
+import numpy as np
+import pandas as pd
+from typing import Dict, Optional, Sequence, Tuple
+from src.query import get_index
+from src.timeseries_store import city_daily_series
+from src.utils import cached_by_version
+
+STATISTICS = ('mean', 'min', 'max', 'std')
+
+@cached_by_version(maxsize=16)
+def city_grid(df: pd.DataFrame, series: str = 'AQI', cities: Optional[Tuple[str, ...]] = None) -> pd.DataFrame:
+    """Daily series of every city on one shared date grid, one column per city
+
+    Days a city has no reading for are NaN, so every column lines up
+    with the same calendar and can be rolled as one 2-D array.
+    """
+    index = get_index(df)
+    cities = [city for city in (cities or index.cities) if city in index.cities]
+    first, last = index.date_bounds(cities)
+    if first is None:
+        return pd.DataFrame(index=pd.DatetimeIndex([], name='Timestamp'), columns=cities, dtype='float64')
+
+    dates = pd.date_range(first.normalize(), last.normalize(), freq='D', name='Timestamp')
+    values = np.full((len(dates), len(cities)), np.nan)
+    for column, city in enumerate(cities):
+        daily = city_daily_series(df, city, series)
+        offset = (daily.index[0] - dates[0]).days if len(daily) else 0
+        values[offset:offset + len(daily), column] = daily.to_numpy()
+    return pd.DataFrame(values, index=dates, columns=cities)
+
+def _window_sums(values: np.ndarray, window: int) -> np.ndarray:
+    """Trailing-window sums along axis 0 from one cumulative sum"""
+    cumulative = np.zeros((values.shape[0] + 1,) + values.shape[1:])
+    np.cumsum(values, axis=0, out=cumulative[1:])
+    sums = cumulative[1:].copy()
+    sums[window:] -= cumulative[1:-window]
+    return sums
+
+def _window_extreme(values: np.ndarray, window: int, reduce: np.ufunc, fill: float) -> np.ndarray:
+    """Trailing-window minimum or maximum along axis 0
+
+    van Herk/Gil-Werman: running extremes forward within blocks of the
+    window length and backward within the same blocks combine into any
+    window's extreme with one more comparison, independent of its length.
+    """
+    rows = values.shape[0]
+    blocks = -(-rows // window)
+    padded = np.full((blocks * window,) + values.shape[1:], fill)
+    padded[:rows] = values
+    shaped = padded.reshape((blocks, window) + values.shape[1:])
+    forward = reduce.accumulate(shaped, axis=1).reshape(padded.shape)[:rows]
+    backward = reduce.accumulate(shaped[:, ::-1], axis=1)[:, ::-1].reshape(padded.shape)
+
+    result = forward.copy()
+    # A window ending at row i starts at i - window + 1, inside the previous block
+    ends = np.arange(window - 1, rows)
+    starts = ends - window + 1
+    result[window - 1:] = reduce(backward[starts], forward[ends])
+    return result
+
+def rolling_window(values: np.ndarray, window: int, min_periods: Optional[int] = None,
+                   statistics: Sequence[str] = STATISTICS) -> Dict[str, np.ndarray]:
+    """Trailing rolling statistics of every column of a 2-D array at once
+
+    Matches pandas' rolling(window, min_periods): NaNs are skipped, and a
+    window with fewer than min_periods values (default: window) is NaN.
+    Standard deviation uses ddof=1.
+    """
+    values = np.asarray(values, dtype='float64')
+    squeeze = values.ndim == 1
+    if squeeze:
+        values = values[:, None]
+    min_periods = window if min_periods is None else min_periods
+    if window < 1 or min_periods > window:
+        raise ValueError(f"Invalid rolling window {window} with min_periods {min_periods}")
+    valid = ~np.isnan(values)
+
+    counts = _window_sums(valid.astype('float64'), window)
+    enough = counts >= max(min_periods, 1)
+    results = {}
+
+    if 'mean' in statistics or 'std' in statistics:
+        # Centering each column first keeps the sum of squares well conditioned
+        present = valid.sum(axis=0)
+        center = np.where(valid, values, 0).sum(axis=0) / np.maximum(present, 1)
+        centered = np.where(valid, values - center, 0)
+        sums = _window_sums(centered, window)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean = sums / counts
+            if 'mean' in statistics:
+                results['mean'] = np.where(enough, mean + center, np.nan)
+            if 'std' in statistics:
+                variance = (_window_sums(centered ** 2, window) - counts * mean ** 2) / (counts - 1)
+                results['std'] = np.where(enough & (counts > 1), np.sqrt(np.clip(variance, 0, None)), np.nan)
+
+    if 'min' in statistics:
+        low = _window_extreme(np.where(valid, values, np.inf), window, np.minimum, np.inf)
+        results['min'] = np.where(enough, low, np.nan)
+    if 'max' in statistics:
+        high = _window_extreme(np.where(valid, values, -np.inf), window, np.maximum, -np.inf)
+        results['max'] = np.where(enough, high, np.nan)
+
+    if squeeze:
+        results = {name: result[:, 0] for name, result in results.items()}
+    return results
+
+def rolling_frame(grid: pd.DataFrame, window: int, min_periods: Optional[int] = None,
+                  statistics: Sequence[str] = STATISTICS) -> Dict[str, pd.DataFrame]:
+    """Rolling statistics of a city grid, one frame per statistic"""
+    results = rolling_window(grid.to_numpy(), window, min_periods, statistics)
+    return {name: pd.DataFrame(result, index=grid.index, columns=grid.columns)
+            for name, result in results.items()}
@@ -0,0 +1,135 @@
+import numpy as np
+import pandas as pd
+from datetime import date
+from typing import Dict, List, Optional, Sequence, Union
+from src.data_loader import POLLUTANTS
+from src.features import SEASONS, CalendarFeatures
+from src.query import CityTimeIndex
+from src.utils import cached_by_version
+
+MEASURES = ['AQI'] + POLLUTANTS
+STATS = ['count', 'sum', 'sumsq', 'min', 'max']
+
+# Calendar keys a rollup can be grouped by, computed from the cell dates
+DIMENSIONS = {
+    'weekday': ('Day', lambda calendar: calendar.labelled('weekday')),
+    'month': ('Month', lambda calendar: calendar.month),
+    'season': ('Season', lambda calendar: calendar.labelled('season')),
+    'year': ('Year', lambda calendar: calendar.year),
+}
+
+DateLike = Union[date, pd.Timestamp, str]
+
+def _cells(keys: List[pd.Series], values: pd.DataFrame) -> pd.DataFrame:
+    """Count, sum, sum of squares, min and max of every measure per key"""
+    grouped = values.groupby(keys, observed=True)
+    stats = {
+        'count': grouped.count(),
+        'sum': grouped.sum(),
+        'sumsq': (values ** 2).groupby(keys, observed=True).sum(),
+        'min': grouped.min(),
+        'max': grouped.max(),
+    }
+    cells = pd.concat(stats, axis=1)
+    cells.columns = [f"{measure}_{stat}" for stat, measure in cells.columns]
+    return cells
+
+def _combine(cells: pd.DataFrame, keys: List, measure: str) -> pd.DataFrame:
+    """Merge cells sharing the same keys and finish them into summary statistics"""
+    columns = [f"{measure}_{stat}" for stat in STATS]
+    grouped = cells[keys + columns].groupby(keys, observed=True)
+    merged = grouped[columns[:3]].sum().join(grouped[columns[3]].min()).join(grouped[columns[4]].max())
+    merged.columns = STATS
+    return _finish(merged)
+
+def _finish(merged: pd.DataFrame) -> pd.DataFrame:
+    """Turn count/sum/sumsq/min/max into count/mean/std/min/max"""
+    count = merged['count'].to_numpy(dtype=float)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = merged['sum'].to_numpy() / count
+        # Sample variance (ddof=1) to match pandas' std
+        variance = (merged['sumsq'].to_numpy() - count * mean ** 2) / (count - 1)
+    result = pd.DataFrame({
+        'count': merged['count'].astype(int),
+        'mean': mean,
+        'std': np.sqrt(np.clip(variance, 0, None)),
+        'min': merged['min'],
+        'max': merged['max'],
+    }, index=merged.index)
+    return result[result['count'] > 0].reset_index()
+
+class RollupCube:
+    """Additive summaries of AQI and pollutants per (City, day) and per calendar key
+
+    Cells hold count, sum, sum of squares, min and max, so any date
+    filter is answered by slicing the daily cells and merging them,
+    without touching the raw rows again.
+    """
+
+    def __init__(self, df: pd.DataFrame):
+        measures = [m for m in MEASURES if m in df.columns]
+        values = df[measures].astype('float64')
+        days = df['Timestamp'].dt.floor('D').rename('Timestamp')
+
+        daily = _cells([df['City'], days], values).reset_index()
+        daily['City'] = daily['City'].astype(str)
+        self.daily = daily
+        self.measures = measures
+        self._index = CityTimeIndex(daily)
+
+        # Hour of day is finer than the daily cells, so it rolls up from the rows
+        hourly = _cells([df['City'], df['Timestamp'].dt.hour.rename('Hour')], values).reset_index()
+        hourly['City'] = hourly['City'].astype(str)
+        self.rollups: Dict[str, pd.DataFrame] = {'hour': hourly}
+        for dimension in DIMENSIONS:
+            self.rollups[dimension] = self._rollup_cells(daily, dimension)
+
+    @staticmethod
+    def _rollup_cells(daily: pd.DataFrame, dimension: str) -> pd.DataFrame:
+        """Merge daily cells into (City, calendar key) cells"""
+        name, key = DIMENSIONS[dimension]
+        keyed = daily.assign(**{name: key(CalendarFeatures(daily['Timestamp']))})
+        columns = [c for c in daily.columns if c not in ('City', 'Timestamp')]
+        sums = [c for c in columns if c.endswith(('_count', '_sum', '_sumsq'))]
+        grouped = keyed.groupby(['City', name], observed=True)
+        cells = grouped[sums].sum()
+        cells = cells.join(grouped[[c for c in columns if c.endswith('_min')]].min())
+        cells = cells.join(grouped[[c for c in columns if c.endswith('_max')]].max())
+        return cells.reset_index()
+
+    @property
+    def cities(self) -> List[str]:
+        return self._index.cities
+
+    def aggregate(self, by: str, measure: str = 'AQI', cities: Optional[Sequence[str]] = None,
+                  start_date: Optional[DateLike] = None, end_date: Optional[DateLike] = None) -> pd.DataFrame:
+        """Summarize a measure per City and calendar key over an inclusive date range
+
+        by is 'date', 'hour' or one of DIMENSIONS. Returns one row per
+        (City, key) with count, mean, std, min and max.
+        """
+        filtered = start_date is not None or end_date is not None
+        if by == 'hour':
+            if filtered:
+                raise ValueError("Hourly rollups cover the whole loaded range only")
+            cells, keys = self.rollups['hour'], ['City', 'Hour']
+        elif by != 'date' and not filtered:
+            cells, keys = self.rollups[by], ['City', DIMENSIONS[by][0]]
+        else:
+            cells = self._index.query(cities, start_date, end_date)
+            cities = None
+            if by == 'date':
+                keys = ['City', 'Timestamp']
+            else:
+                name, key = DIMENSIONS[by]
+                cells = cells.assign(**{name: key(CalendarFeatures(cells['Timestamp']))})
+                keys = ['City', name]
+
+        if cities is not None:
+            cells = cells[cells['City'].isin(cities)]
+        return _combine(cells, keys, measure)
+
+@cached_by_version(maxsize=8)
+def get_cube(df: pd.DataFrame) -> RollupCube:
+    """Build the rollup cube of a loaded frame once per data version"""
+    return RollupCube(df)
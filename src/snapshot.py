@@ -0,0 +1,159 @@
+import pandas as pd
+import threading
+from collections import OrderedDict
+from datetime import date
+from typing import Dict, List, Optional, Tuple
+from pandas.api.types import union_categoricals
+from src.utils import cached_by_version
+
+# Most recent loads whose snapshots are kept up to date as rows are appended
+MAX_LIVE_SNAPSHOTS = 16
+
+def _latest_rows(df: pd.DataFrame, by: str) -> pd.DataFrame:
+    """Latest row of each key, ordered by key"""
+    latest = df.loc[df.groupby(by, observed=True)['Timestamp'].idxmax()] if not df.empty else df
+    return latest.sort_values(by, key=lambda keys: keys.astype(str)).reset_index(drop=True)
+
+def _stack(frames: List[pd.DataFrame]) -> pd.DataFrame:
+    """Concatenate frames of one schema, keeping categorical columns categorical"""
+    df = pd.concat(frames, ignore_index=True)
+    for column, dtype in frames[0].dtypes.items():
+        if isinstance(dtype, pd.CategoricalDtype) and not isinstance(df[column].dtype, pd.CategoricalDtype):
+            df[column] = union_categoricals([frame[column] for frame in frames], ignore_order=True)
+    return df
+
+class LatestSnapshot:
+    """Latest reading per city (or station), ranked by AQI
+
+    Snapshots are immutable: updated() returns a new snapshot with
+    appended rows folded in, at a cost that grows with those rows rather
+    than with the data behind the snapshot. Frames are built on first use.
+    """
+
+    def __init__(self, df: pd.DataFrame, by: str = 'City'):
+        self.by = by
+        self._frame: Optional[pd.DataFrame] = _latest_rows(df, by)
+        self._ranking: Optional[pd.DataFrame] = None
+        # (previous snapshot, appended rows) while the frame is still to be built
+        self._pending: Optional[Tuple["LatestSnapshot", pd.DataFrame]] = None
+        self._lock = threading.Lock()
+
+    def updated(self, rows: Optional[pd.DataFrame]) -> "LatestSnapshot":
+        """Snapshot with rows appended after this one's folded in"""
+        if rows is None or rows.empty:
+            return self
+        with self._lock:
+            pending = self._pending
+        if pending is not None:
+            # Batches between two reads are folded in together
+            previous, earlier = pending
+            pending = (previous, _stack([earlier, rows]))
+        snapshot = LatestSnapshot.__new__(LatestSnapshot)
+        snapshot.by = self.by
+        snapshot._frame = snapshot._ranking = None
+        snapshot._pending = pending or (self, rows)
+        snapshot._lock = threading.Lock()
+        return snapshot
+
+    @property
+    def frame(self) -> pd.DataFrame:
+        """Latest rows, one per key, ordered by key"""
+        with self._lock:
+            if self._frame is None:
+                previous, rows = self._pending
+                base = previous.frame
+                # Appended rows are newer than the cached ones, so only their keys change
+                rows = rows[base.columns] if not base.empty else rows
+                self._frame = _latest_rows(_stack([base, rows]) if not base.empty else rows, self.by)
+                self._pending = None
+            return self._frame
+
+    @property
+    def ranking(self) -> pd.DataFrame:
+        """Latest rows sorted from worst to best AQI"""
+        frame = self.frame
+        with self._lock:
+            if self._ranking is None:
+                self._ranking = frame.sort_values('AQI', ascending=False, na_position='last').reset_index(drop=True)
+            return self._ranking
+
+    def __len__(self) -> int:
+        return len(self.frame)
+
+    @property
+    def worst(self) -> Optional[pd.Series]:
+        return self.ranking.iloc[0] if len(self) else None
+
+    @property
+    def best(self) -> Optional[pd.Series]:
+        ranked = self.ranking.dropna(subset=['AQI'])
+        return ranked.iloc[-1] if not ranked.empty else None
+
+@cached_by_version(maxsize=16)
+def _build_snapshot(df: pd.DataFrame, by: str) -> LatestSnapshot:
+    return LatestSnapshot(df, by)
+
+# Snapshots of loaded frames, keyed by (by, source paths, date range) with the
+# cache checksum of each source they reflect
+_live: "OrderedDict[tuple, Tuple[LatestSnapshot, Dict[str, str]]]" = OrderedDict()
+_live_lock = threading.Lock()
+
+def _lineage(df: pd.DataFrame, by: str) -> Optional[tuple]:
+    """Key of a frame straight from read_data() whose sources all came from the cache"""
+    attrs = df.attrs
+    checksums = attrs.get('cache_checksums')
+    if (attrs.get('loaded_version') is None or attrs.get('data_version') != attrs['loaded_version']
+            or not checksums or None in checksums.values()):
+        return None
+    return (by, tuple(sorted(checksums)), attrs.get('date_range'))
+
+def get_snapshot(df: pd.DataFrame, by: str = 'City') -> LatestSnapshot:
+    """Latest reading per city or station
+
+    Computed once per data version. A frame loaded after rows were
+    appended to its sources gets the previous load's snapshot with those
+    rows folded in (see fold_appended) instead of a rebuilt one.
+    """
+    lineage = _lineage(df, by)
+    if lineage is None:
+        return _build_snapshot(df, by)
+
+    checksums = df.attrs['cache_checksums']
+    with _live_lock:
+        live = _live.get(lineage)
+        if live is not None and live[1] == checksums:
+            _live.move_to_end(lineage)
+            return live[0]
+
+    snapshot = _build_snapshot(df, by)
+    with _live_lock:
+        _live[lineage] = (snapshot, dict(checksums))
+        _live.move_to_end(lineage)
+        while len(_live) > MAX_LIVE_SNAPSHOTS:
+            _live.popitem(last=False)
+    return snapshot
+
+def _in_range(rows: pd.DataFrame, date_range: Tuple[Optional[date], Optional[date]]) -> pd.DataFrame:
+    start_date, end_date = date_range or (None, None)
+    if start_date is not None:
+        rows = rows[rows['Timestamp'] >= pd.Timestamp(start_date)]
+    if end_date is not None:
+        rows = rows[rows['Timestamp'] < pd.Timestamp(end_date) + pd.Timedelta(days=1)]
+    return rows
+
+def fold_appended(path: str, previous: str, current: str, rows: Optional[pd.DataFrame]):
+    """Fold rows appended to one source file into the live snapshots that read it
+
+    Called by the data loader once the rows are cached, with the cache
+    checksums before and after. Snapshots of a different cache state than
+    previous are dropped and rebuilt on their next use.
+    """
+    with _live_lock:
+        for lineage, (snapshot, checksums) in list(_live.items()):
+            if path not in checksums:
+                continue
+            if checksums[path] != previous:
+                del _live[lineage]
+                continue
+            appended = _in_range(rows, lineage[2]) if rows is not None else None
+            _live[lineage] = (snapshot.updated(appended), {**checksums, path: current})
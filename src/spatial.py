@@ -0,0 +1,213 @@
+"""Spatial queries over station locations: nearest stations and IDW surfaces
+
+Stations are indexed in a k-d tree over their positions on the unit
+sphere, where straight-line distance orders stations the same way as
+distance along the Earth's surface. Like src/analytics.py, nothing here
+imports Streamlit.
+"""
+import numpy as np
+import pandas as pd
+from dataclasses import dataclass
+from datetime import date
+from typing import Optional, Sequence, Tuple
+from src.query import get_index
+from src.snapshot import get_snapshot
+from src.stations import registry_version, station_registry
+from src.utils import cached_by_version
+
+EARTH_RADIUS_KM = 6371.0
+
+# Each grid cell averages its k nearest stations weighted by 1 / distance^power
+IDW_NEIGHBOURS = 8
+IDW_POWER = 2.0
+# Cells farther than this from every station are left blank rather than extrapolated
+MAX_DISTANCE_KM = 250.0
+# Floor on distances, so a cell on top of a station takes that station's value
+MIN_DISTANCE_KM = 0.01
+# Grid cells along the longer side of the stations' bounding box
+GRID_CELLS = 128
+
+def unit_vectors(latitudes: Sequence[float], longitudes: Sequence[float]) -> np.ndarray:
+    """Points on the unit sphere, one row (x, y, z) per latitude and longitude in degrees"""
+    lat = np.radians(np.asarray(latitudes, dtype='float64'))
+    lon = np.radians(np.asarray(longitudes, dtype='float64'))
+    return np.column_stack([np.cos(lat) * np.cos(lon), np.cos(lat) * np.sin(lon), np.sin(lat)])
+
+def chord_length(distance_km: float) -> float:
+    """Straight-line distance on the unit sphere between points distance_km apart"""
+    if not np.isfinite(distance_km):
+        return np.inf
+    return 2 * np.sin(min(distance_km / EARTH_RADIUS_KM, np.pi) / 2)
+
+def surface_distance_km(chords: np.ndarray) -> np.ndarray:
+    """Distance along the Earth's surface of unit-sphere chords; inf stays inf"""
+    with np.errstate(invalid='ignore'):
+        return np.where(np.isfinite(chords), 2 * EARTH_RADIUS_KM * np.arcsin(np.minimum(chords, 2) / 2), np.inf)
+
+class StationIndex:
+    """k-d tree over the positions of a set of stations
+
+    stations is indexed by Location with City, Latitude and Longitude
+    columns, in the order of the tree's points.
+    """
+
+    def __init__(self, stations: pd.DataFrame):
+        from scipy.spatial import cKDTree
+
+        self.stations = stations
+        self.tree = cKDTree(unit_vectors(stations['Latitude'], stations['Longitude']))
+
+    def __len__(self) -> int:
+        return len(self.stations)
+
+    def query(self, latitudes: Sequence[float], longitudes: Sequence[float], k: int,
+              max_distance_km: float = np.inf) -> Tuple[np.ndarray, np.ndarray]:
+        """Distances in km and positions of the k nearest stations to each point
+
+        Both results have one row per point and k columns, nearest first.
+        Neighbours beyond max_distance_km have an infinite distance and the
+        position len(self).
+        """
+        k = min(k, len(self))
+        chords, positions = self.tree.query(unit_vectors(latitudes, longitudes), k=k,
+                                            distance_upper_bound=chord_length(max_distance_km))
+        if k == 1:
+            chords, positions = chords[:, None], positions[:, None]
+        return surface_distance_km(chords), positions
+
+    def nearest(self, latitude: float, longitude: float, k: int = 5) -> pd.DataFrame:
+        """The k stations nearest to a point with their distance in km, nearest first"""
+        distances, positions = self.query([latitude], [longitude], k)
+        nearest = self.stations.iloc[positions[0]].reset_index()
+        nearest['Distance_km'] = distances[0]
+        return nearest
+
+@cached_by_version(maxsize=16)
+def get_station_index(df: pd.DataFrame, registry: str) -> Optional[StationIndex]:
+    """Index over the registered stations that have readings in df
+
+    Built once per data version and registry_version(), so moved or
+    added stations are picked up when the registry file changes.
+    """
+    if df.empty or 'Location' not in df.columns:
+        return None
+    locations = get_snapshot(df, by='Location').frame['Location'].astype(str)
+    stations = station_registry().reindex(pd.Index(locations, name='Location')).dropna(subset=['Latitude', 'Longitude'])
+    return StationIndex(stations) if len(stations) else None
+
+def nearest_stations(df: pd.DataFrame, latitude: float, longitude: float, k: int = 5) -> pd.DataFrame:
+    """The k stations of df nearest to a point, with their distance and latest reading"""
+    index = get_station_index(df, registry_version())
+    if index is None:
+        return pd.DataFrame(columns=['Location', 'City', 'Latitude', 'Longitude', 'Distance_km', 'Timestamp', 'AQI'])
+    latest = get_snapshot(df, by='Location').frame
+    latest = latest.assign(Location=latest['Location'].astype(str)).set_index('Location')[['Timestamp', 'AQI']]
+    return index.nearest(latitude, longitude, k).join(latest, on='Location')
+
+def _idw_sums(values: np.ndarray, present: np.ndarray, distances: np.ndarray, positions: np.ndarray,
+              k: int, power: float) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Weighted value sum and weight total per point over its k nearest neighbours with a value
+
+    The third result flags points whose neighbours ran out before k
+    stations with a value, while more may lie within range.
+    """
+    found = positions < len(values)
+    positions = np.where(found, positions, 0)
+    used = found & present[positions]
+    counts = np.cumsum(used, axis=1)
+    used &= counts <= k
+    weights = np.where(used, 1.0 / np.maximum(distances, MIN_DISTANCE_KM) ** power, 0.0)
+    weighted = (weights * np.where(used, values[positions], 0.0)).sum(axis=1)
+    return weighted, weights.sum(axis=1), (counts[:, -1] < k) & found[:, -1]
+
+def idw(index: StationIndex, values: np.ndarray, latitudes: np.ndarray, longitudes: np.ndarray,
+        k: int = IDW_NEIGHBOURS, power: float = IDW_POWER, max_distance_km: float = MAX_DISTANCE_KM) -> np.ndarray:
+    """Inverse-distance-weighted estimate at every point from the values of the indexed stations
+
+    Points are answered by k-nearest queries on the index's tree and one
+    weighted sum over the (points, neighbours) arrays. Stations with a NaN
+    value get no weight: the query reaches past k in proportion to how
+    many are missing, and the few points still short of k stations with a
+    value query again further out. Points without such a station within
+    max_distance_km are NaN.
+    """
+    values = np.asarray(values, dtype='float64')
+    latitudes, longitudes = np.asarray(latitudes), np.asarray(longitudes)
+    present = ~np.isnan(values)
+    reporting = int(present.sum())
+    if not reporting:
+        return np.full(len(latitudes), np.nan)
+
+    reach = min(len(index), -(-k * len(index) // reporting))
+    distances, positions = index.query(latitudes, longitudes, reach, max_distance_km)
+    weighted, total, short = _idw_sums(values, present, distances, positions, k, power)
+    while short.any() and reach < len(index):
+        reach = min(len(index), 2 * reach)
+        points = np.flatnonzero(short)
+        distances, positions = index.query(latitudes[points], longitudes[points], reach, max_distance_km)
+        weighted[points], total[points], short[points] = _idw_sums(values, present, distances, positions, k, power)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return weighted / total
+
+def _mercator_y(latitudes: np.ndarray) -> np.ndarray:
+    return np.log(np.tan(np.pi / 4 + np.radians(latitudes) / 2))
+
+def _mercator_latitude(y: np.ndarray) -> np.ndarray:
+    return np.degrees(2 * np.arctan(np.exp(y)) - np.pi / 2)
+
+@dataclass(frozen=True)
+class Surface:
+    """Interpolated values on a grid, rows from north to south and columns from west to east
+
+    Rows are evenly spaced in Web Mercator, so the grid can be drawn as
+    an image stretched between its bounds on a web map.
+    """
+    values: np.ndarray
+    south: float
+    west: float
+    north: float
+    east: float
+    stations: int
+
+def station_values(df: pd.DataFrame, day: date, measure: str = 'PM2.5') -> pd.Series:
+    """Mean of a measure per station over one day's readings, indexed by Location"""
+    rows = get_index(df).query(None, day, day)
+    if rows.empty or measure not in rows.columns:
+        return pd.Series(dtype='float64', index=pd.Index([], name='Location'))
+    means = rows.groupby('Location', observed=True)[measure].mean()
+    means.index = means.index.astype(str)
+    return means
+
+def idw_surface(df: pd.DataFrame, day: date, measure: str = 'PM2.5', cells: int = GRID_CELLS,
+                max_distance_km: float = MAX_DISTANCE_KM) -> Optional[Surface]:
+    """Grid of one day's station means of a measure interpolated by IDW
+
+    The grid spans every indexed station plus max_distance_km, whichever
+    stations reported that day, so stepping through days keeps it in place.
+    """
+    index = get_station_index(df, registry_version())
+    if index is None:
+        return None
+    values = station_values(df, day, measure).reindex(index.stations.index).to_numpy(dtype='float64')
+    reporting = int((~np.isnan(values)).sum())
+    if not reporting:
+        return None
+
+    pad = np.degrees(max_distance_km / EARTH_RADIUS_KM) if np.isfinite(max_distance_km) else 1.0
+    south = max(index.stations['Latitude'].min() - pad, -85.0)
+    north = min(index.stations['Latitude'].max() + pad, 85.0)
+    west = index.stations['Longitude'].min() - pad
+    east = index.stations['Longitude'].max() + pad
+
+    top, bottom = _mercator_y(np.array([north, south]))
+    span_x, span_y = np.radians(east - west), top - bottom
+    columns = max(int(round(cells * min(span_x / span_y, 1.0))), 1)
+    rows = max(int(round(cells * min(span_y / span_x, 1.0))), 1)
+    # Cell centres: longitudes evenly spaced, latitudes evenly spaced in Mercator y
+    step_x, step_y = (east - west) / columns, span_y / rows
+    longitudes = west + step_x * (np.arange(columns) + 0.5)
+    latitudes = _mercator_latitude(top - step_y * (np.arange(rows) + 0.5))
+
+    grid_lat, grid_lon = np.meshgrid(latitudes, longitudes, indexing='ij')
+    surface = idw(index, values, grid_lat.ravel(), grid_lon.ravel(), max_distance_km=max_distance_km)
+    return Surface(surface.reshape(rows, columns), float(south), float(west), float(north), float(east), reporting)
@@ -0,0 +1,49 @@
+import logging
+import pandas as pd
+from functools import lru_cache
+from typing import Iterable
+from src.data_loader import DATA_DIR, DataValidationError, source_fingerprint
+
+logger = logging.getLogger(__name__)
+
+# One row per monitoring station: its Location name as in the readings,
+# its city and its coordinates in decimal degrees
+REGISTRY_FILE = DATA_DIR / 'stations.csv'
+REGISTRY_COLUMNS = ['Location', 'City', 'Latitude', 'Longitude']
+
+@lru_cache(maxsize=4)
+def _read_registry(path: str, fingerprint: str) -> pd.DataFrame:
+    """Parse and validate a registry file; the fingerprint keys the cache"""
+    registry = pd.read_csv(path, dtype={'Location': str, 'City': str})
+    missing_columns = [col for col in REGISTRY_COLUMNS if col not in registry.columns]
+    if missing_columns:
+        raise DataValidationError(f"Missing columns in {path}: {', '.join(missing_columns)}")
+
+    registry = registry[REGISTRY_COLUMNS].astype({'Latitude': 'float64', 'Longitude': 'float64'})
+    valid = registry['Latitude'].between(-90, 90) & registry['Longitude'].between(-180, 180)
+    if not valid.all():
+        logger.warning(f"Ignoring {(~valid).sum()} stations with invalid coordinates in {path}")
+    registry = registry[valid]
+    if registry['Location'].duplicated().any():
+        logger.warning(f"Duplicate stations in {path}; keeping the last entry of each")
+    return registry.drop_duplicates('Location', keep='last').set_index('Location')
+
+def registry_version() -> str:
+    """Fingerprint of the registry file, or '' without one; caches of station positions key on it"""
+    return source_fingerprint([REGISTRY_FILE]) if REGISTRY_FILE.exists() else ''
+
+def station_registry() -> pd.DataFrame:
+    """City, Latitude and Longitude of every registered station, indexed by Location
+
+    The file is read once and again only after it changes; without a
+    registry file no station has coordinates.
+    """
+    version = registry_version()
+    if not version:
+        return pd.DataFrame(columns=REGISTRY_COLUMNS[1:], index=pd.Index([], name='Location'))
+    return _read_registry(str(REGISTRY_FILE), version)
+
+def station_coordinates(locations: Iterable[str]) -> pd.DataFrame:
+    """Latitude and Longitude of each location, in order; NaN where unregistered"""
+    index = pd.Index([str(location) for location in locations], name='Location')
+    return station_registry()[['Latitude', 'Longitude']].reindex(index)
@@ -4,31 +4,54 @@ import streamlit as st
 import pandas as pd
 from typing import Optional
 import calendar
+from datetime import date
+from src.analytics import (available_months, available_years, create_monthly_trend, has_hourly_readings,
+                           temporal_aggregate)
+from src.downsample import MAX_POINTS, downsample_series
+from src.features import get_calendar
+from src.figure_cache import cached_figure
+from src.profiling import instrumented
+from src.query import get_index
+from src.rollup import DateLike
+from src.rolling import city_grid, rolling_frame
 
 def prepare_temporal_features(df: pd.DataFrame) -> pd.DataFrame:
-    """Extract temporal features from timestamp column"""
+    """Extract temporal features from timestamp column
+
+    The features come from the calendar codes computed once per data
+    version and are attached to a shallow copy, so the existing columns
+    are shared rather than copied. Day, Month and Year come precomputed
+    from the data loader and are only added for frames that lack them.
+    """
     if 'Timestamp' not in df.columns:  # Fixed capitalization
         return df
         
-    df = df.copy()
-    df['Date'] = pd.to_datetime(df['Timestamp']).dt.date
-    df['Day'] = pd.to_datetime(df['Timestamp']).dt.day_name()
-    df['Month'] = pd.to_datetime(df['Timestamp']).dt.month
-    df['Year'] = pd.to_datetime(df['Timestamp']).dt.year
+    calendar = get_calendar(df)
+    df = df.copy(deep=False)
+    df['Date'] = calendar.date
+    if 'Day' not in df.columns:
+        df['Day'] = calendar.labelled('weekday')
+    if 'Month' not in df.columns:
+        df['Month'] = calendar.month
+    if 'Year' not in df.columns:
+        df['Year'] = calendar.year
     return df
 
-def create_daily_trend(df: pd.DataFrame) -> Optional[go.Figure]:
-    """Create daily AQI trend visualization using line plot"""
-    df = prepare_temporal_features(df)
-    
-    if df.empty or 'Day' not in df.columns or 'AQI' not in df.columns:
+@instrumented()
+@cached_figure('daily_trend')
+def create_daily_trend(df: pd.DataFrame, start_date: Optional[DateLike] = None,
+                       end_date: Optional[DateLike] = None) -> Optional[go.Figure]:
+    """Create daily AQI trend visualization using line plot
+
+    Weekday statistics are merged from the rollup cube's daily cells for
+    the inclusive date range rather than recomputed from rows.
+    """
+    if df.empty or 'AQI' not in df.columns:
         return None
         
-    days_order = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 
-                  'Friday', 'Saturday', 'Sunday']
-    
-    daily_data = df.groupby(['City', 'Day'])['AQI'].agg(['mean', 'std']).reset_index()
-    daily_data['Day'] = pd.Categorical(daily_data['Day'], categories=days_order, ordered=True)
+    daily_data = temporal_aggregate(df, 'weekday', 'AQI', start_date, end_date)
+    if daily_data.empty:
+        return None
     
     fig = go.Figure()
     
@@ -58,67 +81,72 @@ def create_daily_trend(df: pd.DataFrame) -> Optional[go.Figure]:
     )
     return fig
 
-def create_monthly_trend(df: pd.DataFrame) -> Optional[go.Figure]:
-    """Create monthly AQI trend visualization"""
-    df = prepare_temporal_features(df)
-    
-    if df.empty or 'Month' not in df.columns:
+@instrumented()
+@cached_figure('hourly_pattern')
+def create_hourly_pattern(df: pd.DataFrame) -> Optional[go.Figure]:
+    """Create hour-of-day AQI pattern from the rollup cube's hourly cells"""
+    if df.empty or 'AQI' not in df.columns:
         return None
         
-    monthly_data = df.groupby(['City', 'Month'])['AQI'].mean().reset_index()
-    
-    # Convert month numbers to names for better readability
-    monthly_data['Month_Name'] = monthly_data['Month'].apply(lambda x: calendar.month_name[x])
+    hourly_data = temporal_aggregate(df, 'hour')
+    if hourly_data.empty:
+        return None
     
     fig = px.line(
-        monthly_data,
-        x='Month',
-        y='AQI',
+        hourly_data,
+        x='Hour',
+        y='mean',
         color='City',
-        title='Monthly AQI Trends',
-        labels={'Month': 'Month', 'AQI': 'Average AQI'}
+        title='24-Hour AQI Pattern by City',
+        labels={'Hour': 'Hour of Day', 'mean': 'Average AQI'},
+        markers=True
     )
     
     fig.update_layout(
-        xaxis=dict(
-            tickmode='array',
-            ticktext=monthly_data['Month_Name'].unique(),
-            tickvals=monthly_data['Month'].unique(),
-            title='Month'
-        ),
+        xaxis=dict(tickmode='linear', dtick=2),
         hovermode='x unified'
     )
     return fig
 
-def create_yearly_trend(df: pd.DataFrame) -> Optional[go.Figure]:
-    """Create yearly trend with rolling average"""
-    df = prepare_temporal_features(df)
-    
+
+@instrumented()
+@cached_figure('yearly_trend')
+def create_yearly_trend(df: pd.DataFrame, start_date: Optional[DateLike] = None,
+                        end_date: Optional[DateLike] = None, max_points: int = MAX_POINTS) -> Optional[go.Figure]:
+    """Create yearly trend with rolling average
+
+    Every city's daily series sits on one shared date grid and the
+    30-day averages of all of them come from a single rolling pass over
+    the full range. Only the inclusive [start_date, end_date] window is
+    plotted, each trace downsampled to at most max_points, so narrowing
+    the window brings back full resolution.
+    """
     if df.empty or 'Timestamp' not in df.columns:  # Fixed capitalization
         return None
         
-    df_daily = df.set_index('Timestamp').groupby('City')['AQI'].resample('D').mean()
-    df_rolling = df_daily.groupby('City').transform(
-        lambda x: x.rolling(window=30, min_periods=1).mean()
-    )
+    daily = city_grid(df, 'AQI')
+    rolling = rolling_frame(daily, window=30, min_periods=1, statistics=('mean',))['mean']
+    visible = slice(pd.Timestamp(start_date) if start_date is not None else None,
+                    pd.Timestamp(end_date) if end_date is not None else None)
+    daily, rolling = daily.loc[visible], rolling.loc[visible]
     
     fig = go.Figure()
     
-    for city in df_daily.index.get_level_values(0).unique():
-        city_data = df_daily[city].reset_index()
-        city_rolling = df_rolling[city].reset_index()
+    for city in daily.columns:
+        city_daily = downsample_series(daily[city], max_points)
+        city_rolling = downsample_series(rolling[city], max_points)
         
         fig.add_trace(go.Scatter(
-            x=city_data['Timestamp'],
-            y=city_data['AQI'],
+            x=city_daily.index,
+            y=city_daily.values,
             name=f"{city} (Daily)",
             opacity=0.2,
             showlegend=False
         ))
         
         fig.add_trace(go.Scatter(
-            x=city_rolling['Timestamp'],
-            y=city_rolling['AQI'],
+            x=city_rolling.index,
+            y=city_rolling.values,
             name=f"{city} (30-day avg)",
             line=dict(width=3)
         ))
@@ -131,6 +159,7 @@ def create_yearly_trend(df: pd.DataFrame) -> Optional[go.Figure]:
     )
     return fig
 
+@instrumented('section')
 def show_temporal_analysis(df: pd.DataFrame):
     """Display temporal analysis visualizations with enhanced filtering"""
     st.subheader("📊 Temporal Analysis of Air Quality")
@@ -139,82 +168,101 @@ def show_temporal_analysis(df: pd.DataFrame):
         st.warning("No data available for the selected filters.")
         return
     
-    # Prepare temporal features
-    df = prepare_temporal_features(df)
+    # Hour-of-day patterns only mean something for sub-daily readings
+    periods = ["Daily", "Monthly", "Yearly"]
+    if has_hourly_readings(df):
+        periods.insert(0, "Hourly")
     
     analysis_type = st.radio(
         "Select Time Period",
-        ["Daily", "Monthly", "Yearly"],
+        periods,
         horizontal=True
     )
     
-    if analysis_type == "Daily":
+    if analysis_type == "Hourly":
+        fig = create_hourly_pattern(df)
+        if fig is None:
+            st.warning("No hourly data available for the selected filters.")
+        else:
+            st.plotly_chart(fig, use_container_width=True)
+            with st.expander("💡 Hourly Pattern Analysis"):
+                st.write("""
+                - Line plot shows average AQI for each hour of the day
+                - Compare morning and evening traffic peaks across cities
+                """)
+    
+    elif analysis_type == "Daily":
         # Add year and month filters
         col1, col2 = st.columns(2)
         
         # Year selector
-        available_years = sorted(df['Year'].unique())
+        years = available_years(df)
         selected_year = col1.selectbox(
             "Select Year",
-            options=available_years,
-            index=len(available_years)-1  # Default to latest year
+            options=years,
+            index=len(years)-1  # Default to latest year
         )
         
         # Month selector - show only months with data for selected year
-        available_months = sorted(df[df['Year'] == selected_year]['Month'].unique())
+        months = available_months(df, selected_year)
         selected_month = col2.selectbox(
             "Select Month",
-            options=available_months,
+            options=months,
             format_func=lambda x: calendar.month_name[x],
-            index=len(available_months)-1  # Default to latest month
+            index=len(months)-1  # Default to latest month
         )
         
-        # Filter data based on selection
-        filtered_df = df[
-            (df['Year'] == selected_year) & 
-            (df['Month'] == selected_month)
-        ]
+        fig = create_daily_trend(
+            df,
+            start_date=date(selected_year, selected_month, 1),
+            end_date=date(selected_year, selected_month, calendar.monthrange(selected_year, selected_month)[1])
+        )
         
-        if filtered_df.empty:
+        if fig is None:
             st.warning(f"No data available for {calendar.month_name[selected_month]} {selected_year}")
         else:
-            fig = create_daily_trend(filtered_df)
-            if fig:
-                st.plotly_chart(fig, use_container_width=True)
-                with st.expander("💡 Daily Pattern Analysis"):
-                    st.write(f"""
-                    - Line plot shows average AQI by day of week for {calendar.month_name[selected_month]} {selected_year}
-                    - Error bands show variation in measurements
-                    - Compare weekday vs weekend patterns
-                    """)
+            st.plotly_chart(fig, use_container_width=True)
+            with st.expander("💡 Daily Pattern Analysis"):
+                st.write(f"""
+                - Line plot shows average AQI by day of week for {calendar.month_name[selected_month]} {selected_year}
+                - Error bands show variation in measurements
+                - Compare weekday vs weekend patterns
+                """)
                 
     elif analysis_type == "Monthly":
         # Year selector for monthly trends
-        available_years = sorted(df['Year'].unique())
+        years = available_years(df)
         selected_year = st.selectbox(
             "Select Year",
-            options=available_years,
-            index=len(available_years)-1
+            options=years,
+            index=len(years)-1
         )
         
-        # Filter data for selected year
-        filtered_df = df[df['Year'] == selected_year]
+        # Aggregate the selected year only
+        fig = create_monthly_trend(df, start_date=date(selected_year, 1, 1), end_date=date(selected_year, 12, 31))
         
-        if filtered_df.empty:
+        if fig is None:
             st.warning(f"No data available for year {selected_year}")
         else:
-            fig = create_monthly_trend(filtered_df)
-            if fig:
-                st.plotly_chart(fig, use_container_width=True)
-                st.write(f"Monthly AQI trends for {selected_year}")
+            st.plotly_chart(fig, use_container_width=True)
+            st.write(f"Monthly AQI trends for {selected_year}")
             
     else:  # Yearly
-        fig = create_yearly_trend(df)
+        # Zooming re-renders the chosen window from full-resolution data
+        first_timestamp, last_timestamp = get_index(df).date_bounds()
+        visible_range = st.slider(
+            "Zoom to Dates",
+            min_value=first_timestamp.date(),
+            max_value=last_timestamp.date(),
+            value=(first_timestamp.date(), last_timestamp.date())
+        )
+        fig = create_yearly_trend(df, start_date=visible_range[0], end_date=visible_range[1])
         if fig:
             st.plotly_chart(fig, use_container_width=True)
             with st.expander("💡 Yearly Trend Analysis"):
                 st.write("""
                 - Solid lines show 30-day rolling averages
                 - Transparent lines show daily variations
+                - Narrow the zoom range to see every day in detail
                 - Compare long-term trends across cities
                 """)
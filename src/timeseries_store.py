@@ -0,0 +1,194 @@
+import numpy as np
+import pandas as pd
+import json
+import logging
+import os
+import re
+import shutil
+import threading
+import warnings
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from src.data_loader import CACHE_DIR, POLLUTANTS, RESOLUTIONS, city_sources, read_city, source_fingerprint
+from src.query import get_index
+
+logger = logging.getLogger(__name__)
+
+STORE_DIR = CACHE_DIR / 'timeseries'
+INDEX_FILE = 'index.json'
+
+# AQI keeps its daily range for the historical trend band; pollutants keep daily means
+SERIES = ['AQI', 'AQI_min', 'AQI_max'] + POLLUTANTS
+# Column and rule of each series that is not a mean; the rule both reduces a
+# station's day and combines the city's stations
+RULES = {'AQI_min': ('AQI', 'min'), 'AQI_max': ('AQI', 'max')}
+
+_STORES: Dict[Path, 'TimeSeriesStore'] = {}
+_STORE_LOCK = threading.Lock()
+
+class TimeSeriesStore:
+    """Memory-mapped daily series for the stations of one city
+
+    Every station and series is a contiguous float32 array on a daily grid
+    shared by the whole city, so reading a date range is a zero-copy slice
+    of pages the OS can share between processes and sessions.
+    """
+
+    def __init__(self, root: Path):
+        with open(root / INDEX_FILE) as f:
+            meta = json.load(f)
+        self.root = root
+        self.city = meta['city']
+        self.start = np.datetime64(meta['start'], 'D')
+        self.length = meta['length']
+        self.stations: Dict[str, str] = meta['stations']  # station name -> file slug
+        self._arrays: Dict[Tuple[str, str], np.ndarray] = {}
+
+    def array(self, station: str, series: str) -> np.ndarray:
+        """Full memory-mapped series of one station"""
+        key = (station, series)
+        if key not in self._arrays:
+            self._arrays[key] = np.load(self.root / f"{self.stations[station]}__{series}.npy", mmap_mode='r')
+        return self._arrays[key]
+
+    def _positions(self, start: Optional[pd.Timestamp], end: Optional[pd.Timestamp]) -> Tuple[int, int]:
+        """Grid positions covering the inclusive date range"""
+        first = 0 if start is None else int((np.datetime64(start, 'D') - self.start).astype(int))
+        last = self.length if end is None else int((np.datetime64(end, 'D') - self.start).astype(int)) + 1
+        return max(first, 0), max(min(last, self.length), 0)
+
+    def read(self, series: str, start: Optional[pd.Timestamp] = None, end: Optional[pd.Timestamp] = None,
+             station: Optional[str] = None) -> pd.Series:
+        """Daily series for one station, or averaged over the city's stations
+
+        Single-station reads wrap the memory map without copying.
+        """
+        first, last = self._positions(start, end)
+        dates = pd.DatetimeIndex(np.arange(self.start + first, self.start + last, dtype='datetime64[D]'))
+        stations = [station] if station is not None else list(self.stations)
+
+        if len(stations) == 1:
+            values = self.array(stations[0], series)[first:last]
+        else:
+            stacked = np.vstack([self.array(name, series)[first:last] for name in stations])
+            # Days no station reported stay NaN
+            with warnings.catch_warnings():
+                warnings.simplefilter('ignore', RuntimeWarning)
+                _, rule = _column_rule(series)
+                values = {'min': np.nanmin, 'max': np.nanmax, 'mean': np.nanmean}[rule](stacked, axis=0)
+
+        return pd.Series(values, index=dates, name=series, copy=False)
+
+def _column_rule(series: str) -> Tuple[str, str]:
+    """Source column and reduction of a series"""
+    return RULES.get(series, (series, 'mean'))
+
+def _slug(name: str) -> str:
+    return re.sub(r'[^A-Za-z0-9]+', '_', name).strip('_').lower()
+
+def daily_by_station(df: pd.DataFrame, series: List[str] = SERIES) -> pd.DataFrame:
+    """Daily value of each series per station, indexed by (Location, Timestamp)
+
+    Rows without a station count as one station of their own.
+    """
+    days = df['Timestamp'].dt.floor('D')
+    stations = df['Location'] if 'Location' in df.columns else pd.Series('', index=df.index, name='Location')
+    grouped = df.groupby([stations, days], observed=True)
+    daily = {}
+    for name in series:
+        column, rule = _column_rule(name)
+        daily[name] = grouped[column].agg(rule)
+    return pd.DataFrame(daily)
+
+def build_store(df: pd.DataFrame, city: str, root: Path) -> Path:
+    """Write the daily store of one city's rows to root"""
+    days = df['Timestamp'].dt.floor('D')
+    start = days.min().to_datetime64().astype('datetime64[D]')
+    length = int((days.max().to_datetime64().astype('datetime64[D]') - start).astype(int)) + 1
+
+    daily = daily_by_station(df)
+
+    tmp_root = root.with_name(f".{root.name}.{os.getpid()}.{threading.get_ident()}")
+    tmp_root.mkdir(parents=True)
+    stations = {}
+    for station, station_daily in daily.groupby(level='Location', observed=True):
+        slug = _slug(str(station))
+        stations[str(station)] = slug
+        positions = (station_daily.index.get_level_values('Timestamp').to_numpy().astype('datetime64[D]') - start).astype(int)
+        for series in SERIES:
+            grid = np.full(length, np.nan, dtype=np.float32)
+            grid[positions] = station_daily[series].to_numpy(dtype=np.float32)
+            np.save(tmp_root / f"{slug}__{series}.npy", grid)
+
+    with open(tmp_root / INDEX_FILE, 'w') as f:
+        json.dump({'city': city, 'start': str(start), 'length': length, 'stations': stations}, f)
+    tmp_root.replace(root)
+    return root
+
+def open_store(city: str, path: Path) -> Optional[TimeSeriesStore]:
+    """Open the store of a city source file, rebuilding it when the file changed"""
+    fingerprint = source_fingerprint([path])
+    root = STORE_DIR / f"{path.stem}-{fingerprint}"
+
+    with _STORE_LOCK:
+        if root in _STORES:
+            return _STORES[root]
+        try:
+            if not (root / INDEX_FILE).exists():
+                STORE_DIR.mkdir(parents=True, exist_ok=True)
+                for stale in STORE_DIR.glob(f"{path.stem}-*"):
+                    shutil.rmtree(stale)
+                build_store(read_city(city, path), city, root)
+                logger.info(f"Built time-series store for {city}")
+            _STORES[root] = TimeSeriesStore(root)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Time-series store unavailable for {city}: {str(e)}")
+            return None
+        return _STORES[root]
+
+def rebuild_all() -> List[Path]:
+    """Rebuild the stores of every city and resolution from the source CSVs"""
+    roots = []
+    sources = [(city, path) for resolution in RESOLUTIONS for city, path in city_sources(resolution).items()]
+    for city, path in sources:
+        root = STORE_DIR / f"{path.stem}-{source_fingerprint([path])}"
+        if root.exists():
+            shutil.rmtree(root)
+        with _STORE_LOCK:
+            _STORES.pop(root, None)
+        store = open_store(city, path)
+        if store is not None:
+            roots.append(store.root)
+    return roots
+
+def city_daily_series(df: pd.DataFrame, city: str, series: str = 'AQI') -> pd.Series:
+    """Daily series of one city over the date range it spans in df
+
+    Frames produced by the loader (and their index slices) record the
+    source file and fingerprint of each city, and are answered from the
+    matching memory-mapped store. Other frames fall back to their rows,
+    combining the stations' daily values the way the store does.
+    """
+    index = get_index(df)
+    first, last = index.date_bounds([city])
+    fingerprint = df.attrs.get('source_fingerprints', {}).get(city)
+    source = df.attrs.get('source_paths', {}).get(city)
+    path = Path(source) if fingerprint and source else None
+
+    # A source that changed since df was loaded no longer matches its rows
+    if path is not None and source_fingerprint([path]) == fingerprint:
+        store = open_store(city, path)
+        if store is not None:
+            return store.read(series, first, last)
+
+    daily = daily_by_station(index.query([city]), [series])[series]
+    _, rule = _column_rule(series)
+    values = daily.groupby(level='Timestamp').agg(rule)
+    if values.empty:
+        return values.rename(series)
+    return values.reindex(pd.date_range(first.floor('D'), last.floor('D'), freq='D', name='Timestamp')).rename(series)
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    for root in rebuild_all():
+        print(root)
@@ -0,0 +1,52 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from functools import wraps
+from typing import Callable, Optional
+import pandas as pd
+
+def data_version(df: pd.DataFrame) -> Optional[str]:
+    """Return the data version stamped on a frame by the loader, if any"""
+    return df.attrs.get('data_version')
+
+def derive_version(version: Optional[str], *parts) -> Optional[str]:
+    """Derive the version of a frame computed from a versioned parent"""
+    if version is None:
+        return None
+    key = ':'.join([version] + [str(part) for part in parts])
+    return hashlib.sha1(key.encode()).hexdigest()[:16]
+
+def cached_by_version(maxsize: int = 8) -> Callable:
+    """Memoize func(df, *args) per data version of df
+
+    Results are shared across sessions and reruns, bounded to the most
+    recently used maxsize entries. Frames without a data version are
+    never cached, so callers that derive frames by other means get a
+    fresh result instead of a stale one.
+    """
+    def decorator(func: Callable) -> Callable:
+        cache: "OrderedDict[tuple, object]" = OrderedDict()
+        lock = threading.Lock()
+
+        @wraps(func)
+        def wrapper(df: pd.DataFrame, *args, **kwargs):
+            version = data_version(df)
+            if version is None:
+                return func(df, *args, **kwargs)
+
+            key = (version, args, tuple(sorted(kwargs.items())))
+            with lock:
+                if key in cache:
+                    cache.move_to_end(key)
+                    return cache[key]
+
+            result = func(df, *args, **kwargs)
+            with lock:
+                cache[key] = result
+                while len(cache) > maxsize:
+                    cache.popitem(last=False)
+            return result
+
+        wrapper.cache_clear = cache.clear
+        return wrapper
+    return decorator